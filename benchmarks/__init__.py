@@ -0,0 +1,10 @@
+"""Banc d'essai reproductible du dashboard (données synthétiques, hors ligne)
+
+Générer puis mesurer, depuis la racine du dépôt ::
+
+    python -m benchmarks.run --tailles 100k 1M --source sqlite --sortie bench.json
+    python -m benchmarks.run --tailles 100k --comparer bench.json
+
+Chaque étape n'est exécutée que ``--repetitions`` fois ; ``--memoire`` ajoute une
+exécution tracée par étape pour mesurer son pic mémoire.
+"""
@@ -0,0 +1,132 @@
+"""Générateur synthétique suivant le schéma de ``untitled.csv`` et des dimensions associées"""
+import os
+import sqlite3
+import string
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SIZES = {'100k': 100_000, '1M': 1_000_000, '10M': 10_000_000, '50M': 50_000_000}
+GENERATION_CHUNK_ROWS = 1_000_000
+
+SEGMENTS = ['Soda PET PM', 'Soda PET GM', 'Eau PET', 'Jus Brique', 'Soda Canette']
+PRODUITS_PAR_SEGMENT = 15  # = lignes par visite : tous les produits du segment sont relevés
+MARQUES = [f"Marque {i}" for i in range(12)]
+ZONES = ['Casablanca', 'Rabat', 'Marrakech', 'Fès', 'Tanger', 'Agadir', 'Oujda', 'Meknès']
+PERIODE = (pd.Timestamp('2025-01-01'), pd.Timestamp('2025-12-31'))
+PREMIER_ID = 140_000
+PREMIERE_VISITE = 5_000_000
+
+
+def parse_size(taille):
+    """'1M' -> 1 000 000 ; accepte aussi un entier"""
+    return SIZES[taille] if taille in SIZES else int(taille)
+
+
+def store_count(n_rows):
+    """Nombre de points de vente, croissant avec le volume"""
+    return int(min(20_000, max(50, n_rows // 2_000)))
+
+
+def make_dimensions(n_rows, seed=0):
+    """Tables produits et points_de_vente cohérentes avec les observations générées"""
+    rng = np.random.default_rng(seed)
+    n_produits = len(SEGMENTS) * PRODUITS_PAR_SEGMENT
+    produits = pd.DataFrame({
+        'id': np.arange(1, n_produits + 1),
+        'nom': [f"Produit {i:03d}" for i in range(1, n_produits + 1)],
+        'marque': np.array(MARQUES)[rng.integers(0, len(MARQUES), n_produits)],
+        'date_creation': '2024-01-01'
+    })
+
+    n_pdv = store_count(n_rows)
+    lettres = np.array(list(string.ascii_uppercase + string.digits))
+    codes = set()
+    while len(codes) < n_pdv:
+        codes.update(''.join(code) for code in lettres[rng.integers(0, len(lettres), (n_pdv, 5))])
+    codes = sorted(codes)[:n_pdv]
+    ouverture = PERIODE[0] + pd.to_timedelta(rng.integers(0, 365, n_pdv), unit='D')
+    points_de_vente = pd.DataFrame({
+        'id': np.arange(1, n_pdv + 1),
+        'nom': codes,
+        'zone': np.array(ZONES)[rng.integers(0, len(ZONES), n_pdv)],
+        'latitude': 30 + 5 * rng.random(n_pdv),
+        'longitude': -9 + 7 * rng.random(n_pdv),
+        # Environ un tiers des points de vente ont une date d'ouverture renseignée
+        'date_ouverture': pd.Series(ouverture.strftime('%Y-%m-%d')).where(rng.random(n_pdv) < 0.35)
+    })
+    return produits, points_de_vente
+
+
+def iter_tracking(n_rows, points_de_vente, seed=0, chunk_rows=GENERATION_CHUNK_ROWS):
+    """Observations par blocs : une visite = un point de vente, un segment, tous ses produits
+
+    Les identifiants et horodatages sont croissants, comme dans la table source.
+    """
+    rng = np.random.default_rng(seed + 1)
+    codes = points_de_vente['nom'].to_numpy()
+    n_produits = len(SEGMENTS) * PRODUITS_PAR_SEGMENT
+    taux_produit = rng.beta(5, 2, n_produits)
+    n_visites = -(-n_rows // PRODUITS_PAR_SEGMENT)
+    duree_us = (PERIODE[1] - PERIODE[0]).value // 1_000
+    pas_us = duree_us // n_visites
+
+    chunk_rows -= chunk_rows % PRODUITS_PAR_SEGMENT  # les blocs ne coupent pas une visite
+    for debut in range(0, n_rows, chunk_rows):
+        lignes = np.arange(debut, min(debut + chunk_rows, n_rows))
+        visite = lignes // PRODUITS_PAR_SEGMENT
+        position = lignes % PRODUITS_PAR_SEGMENT
+
+        visites = np.unique(visite)
+        segment_visite = rng.integers(0, len(SEGMENTS), len(visites))
+        pdv_visite = rng.integers(0, len(codes), len(visites))
+        rang = visite - visites[0]
+
+        product_id = segment_visite[rang] * PRODUITS_PAR_SEGMENT + position + 1
+        created_on = PERIODE[0] + pd.to_timedelta(visite * pas_us + position * 60_000, unit='us')
+        yield pd.DataFrame({
+            'id': PREMIER_ID + lignes,
+            'visit_id': PREMIERE_VISITE + visite,
+            'product_id': product_id,
+            'value': rng.random(len(lignes)) < taux_produit[product_id - 1],
+            'created_on': created_on,
+            'id_point_de_vente': codes[pdv_visite[rang]],
+            'segment': np.array(SEGMENTS)[segment_visite[rang]]
+        })
+
+
+def write_sqlite(path, n_rows, seed=0):
+    """Base SQLite reprenant les tables tracking_presence, produits et points_de_vente"""
+    if os.path.exists(path):
+        os.remove(path)
+    produits, points_de_vente = make_dimensions(n_rows, seed)
+    with sqlite3.connect(path) as conn:
+        produits.to_sql('produits', conn, index=False)
+        points_de_vente.to_sql('points_de_vente', conn, index=False)
+        for chunk in iter_tracking(n_rows, points_de_vente, seed):
+            chunk['created_on'] = chunk['created_on'].dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+            chunk.to_sql('tracking_presence', conn, index=False, if_exists='append')
+        conn.execute("CREATE INDEX idx_tracking_id ON tracking_presence (id)")
+    return path
+
+
+def write_parquet(directory, n_rows, seed=0):
+    """Fichiers Parquet (un groupe de lignes par bloc généré) pour les trois tables"""
+    os.makedirs(directory, exist_ok=True)
+    produits, points_de_vente = make_dimensions(n_rows, seed)
+    produits.to_parquet(os.path.join(directory, 'produits.parquet'), index=False)
+    points_de_vente.to_parquet(os.path.join(directory, 'points_de_vente.parquet'), index=False)
+
+    writer = None
+    try:
+        for chunk in iter_tracking(n_rows, points_de_vente, seed):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(os.path.join(directory, 'tracking_presence.parquet'), table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return directory
@@ -0,0 +1,225 @@
+"""Mesure du temps et du pic mémoire de chaque étape du dashboard, résultats en JSON"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from benchmarks.generator import parse_size, write_parquet, write_sqlite
+from presence import engine
+from presence.cube import build_cube
+from presence.filters import FilterIndex
+from presence.geo import GeoGrid
+from presence.ingestion import DEFAULT_CHUNK_ROWS
+from presence.sources import TABLES_DIMENSIONS, FileSource, as_source
+from presence.star import build_dimensions, concat_tables, encode_facts, with_calendar
+from presence.streaks import StreakState
+
+BENCH_DIR = os.path.join(".cache", "benchmarks")
+REGRESSION_THRESHOLD = 1.2
+
+
+def measure(fn, repetitions=1, trace_memory=False):
+    """Exécute ``fn`` et retourne ``(résultat, durée_s minimale, pic mémoire Python en Mo ou None)``
+
+    ``fn`` est exécutée ``repetitions`` fois, sans tracemalloc (ses crochets
+    d'allocation ralentissent pandas et numpy de façon variable). Si
+    ``trace_memory``, le pic est mesuré par une exécution tracée supplémentaire
+    (allocations Python et numpy ; les tampons Arrow n'y figurent pas) : à
+    réserver aux tailles où exécuter deux fois chaque étape reste acceptable.
+    """
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fn()
+        durees.append(time.perf_counter() - debut)
+
+    if not trace_memory:
+        return resultat, min(durees), None
+    del resultat
+    tracemalloc.start()
+    try:
+        resultat = fn()
+        pic = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return resultat, min(durees), pic / 1024 ** 2
+
+
+def prepare(taille, source, repertoire, seed=0):
+    """Génère (une seule fois) le jeu synthétique de la taille demandée"""
+    n_rows = parse_size(taille)
+    os.makedirs(repertoire, exist_ok=True)
+    if source == 'sqlite':
+        path = os.path.join(repertoire, f"presence_{taille}_{seed}.db")
+        if not os.path.exists(path):
+            write_sqlite(path, n_rows, seed)
+    else:
+        path = os.path.join(repertoire, f"presence_{taille}_{seed}")
+        if not os.path.exists(os.path.join(path, 'tracking_presence.parquet')):
+            write_parquet(path, n_rows, seed)
+    return path
+
+
+def load_stages(path, source, mesurer, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Chargement complet par le chargeur de l'app, puis ses étapes mesurées une à une
+
+    ``chargement`` est le rafraîchissement complet d'un chargeur neuf (ingestion
+    SQL ou lecture Arrow des fichiers Parquet). L'ingestion est ensuite rejouée
+    sur les mêmes blocs : lecture et construction des dimensions, fusion (codage
+    des faits sur les clés des dimensions) et enrichissement (calendrier) cumulés
+    sur tous les blocs, concaténation, cube. Retourne le ``Dataset`` chargé.
+    """
+    source = as_source(create_engine(f"sqlite:///{path}") if source == 'sqlite' else FileSource(path))
+    dataset = mesurer('chargement', lambda: engine.load(source), repetitions=1)
+
+    produits, points_de_vente = mesurer('lecture_dimensions', lambda: [source.read_dimension(name) for name in TABLES_DIMENSIONS])
+    dimensions = mesurer('dimensions', lambda: build_dimensions(produits, points_de_vente))
+
+    tables = []
+    with source.read_tracking() as fetch:
+        while len(bloc := fetch(chunk_rows)):
+            faits = mesurer('fusion', lambda: encode_facts(bloc, dimensions), repetitions=1, cumul=True)
+            tables.append(mesurer('enrichissement', lambda: with_calendar(faits, dimensions), repetitions=1, cumul=True))
+    table = mesurer('concatenation', lambda: concat_tables(tables), repetitions=1)
+    mesurer('cube', lambda: build_cube(table), repetitions=1)
+    return dataset
+
+
+def run_size(taille, source, repertoire, repetitions=1, seed=0, trace_memory=False):
+    """Mesure toutes les étapes pour une taille ; retourne les volumes et ``{étape: mesures}``
+
+    ``pic_mo`` n'est renseigné que si ``trace_memory`` (voir ``measure``).
+    """
+    import app_tracking_presence as app  # importé ici : l'app configure Streamlit à l'import
+
+    path = prepare(taille, source, repertoire, seed)
+    etapes = {}
+
+    def mesurer(nom, fn, repetitions=repetitions, cumul=False):
+        """Mesure une étape ; ``cumul`` additionne les durées (et garde le pic maximal) des appels successifs"""
+        resultat, duree, pic = measure(fn, repetitions, trace_memory)
+        if cumul and nom in etapes:
+            duree += etapes[nom]['duree_s']
+            if pic is not None:
+                pic = max(pic, etapes[nom]['pic_mo'])
+        etapes[nom] = {'duree_s': round(duree, 4), 'pic_mo': None if pic is None else round(pic, 1)}
+        if not cumul:
+            journaliser(nom, etapes[nom])
+        return resultat
+
+    def journaliser(nom, mesure):
+        pic = "" if mesure['pic_mo'] is None else f"{mesure['pic_mo']:9.1f} Mo"
+        logging.info("%s %-22s %8.3f s %s", taille, nom, mesure['duree_s'], pic)
+
+    # Le chargement n'est chronométré qu'une fois (il fournit le jeu des étapes suivantes)
+    dataset = load_stages(path, source, mesurer)
+    for nom in ('fusion', 'enrichissement'):
+        journaliser(nom, etapes[nom])
+    df, cube = dataset.df, dataset.cube
+
+    # Filtres par défaut de la barre latérale : toute la période, 10 marques, tous segments et zones
+    filtres = engine.default_filters(engine.options(dataset))
+
+    # Mêmes chemins que l'app en mode mémoire (moteur pandas, grille géographique de la version)
+    index = mesurer('index_filtres', lambda: FilterIndex(df))
+    mesurer('filtrage_observations', lambda: FilterIndex(df).filter(*filtres))
+    selection = mesurer('filtrage_cube', lambda: engine.select(dataset, filtres))
+    grille = mesurer('grille_geo', lambda: GeoGrid(cube))
+
+    mesurer('calculate_kpis', lambda: app.calculate_kpis(selection))
+    mesurer('create_brand_chart', lambda: app.create_brand_chart(selection))
+    mesurer('create_segment_chart', lambda: app.create_segment_chart(selection))
+    mesurer('create_geo_chart', lambda: app.create_geo_chart(selection, grid=grille, filters=filtres))
+    mesurer('create_time_chart', lambda: app.create_time_chart(selection))
+
+    # Agrégations de la page d'analyses détaillées
+    produits = mesurer('analyse_produits', lambda: engine.aggregate(selection, 'produits').reset_index())
+    mesurer('classement_produits', lambda: engine.product_ranking(produits))
+    mesurer('analyse_zones', lambda: engine.zone_stats(selection))
+
+    # Ruptures : état complet (démarrage) puis alertes de la page
+    ruptures = mesurer('ruptures_etat', lambda: StreakState.from_table(df))
+    mesurer('ruptures_alertes', lambda: ruptures.alerts(marques=filtres.marques, zones=filtres.zones))
+    return {'lignes': len(df), 'lignes_filtrees': len(index.filter(*filtres)), 'etapes': etapes}
+
+
+def metadata():
+    """Version du code et de l'environnement, pour comparer des exécutions"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'horodatage': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plateforme': platform.platform()
+    }
+
+
+def compare(reference, courant, seuil=REGRESSION_THRESHOLD):
+    """Liste les étapes dont la durée dépasse ``seuil`` fois celle de la référence"""
+    regressions = []
+    for taille, resultat in courant['resultats'].items():
+        etapes_reference = reference['resultats'].get(taille, {}).get('etapes', {})
+        for nom, mesure in resultat['etapes'].items():
+            avant = etapes_reference.get(nom)
+            if not avant or not avant['duree_s']:
+                continue
+            ratio = mesure['duree_s'] / avant['duree_s']
+            if ratio > seuil:
+                regressions.append((taille, nom, avant['duree_s'], mesure['duree_s'], round(ratio, 2)))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai du dashboard de présence")
+    parser.add_argument('--tailles', nargs='+', default=['100k'], help="100k, 1M, 10M, 50M ou un nombre de lignes")
+    parser.add_argument('--source', choices=['sqlite', 'parquet'], default='sqlite')
+    parser.add_argument('--repertoire', default=BENCH_DIR, help="répertoire des jeux générés")
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--graine', type=int, default=0)
+    parser.add_argument('--sortie', default=None, help="fichier JSON des résultats")
+    parser.add_argument('--comparer', default=None, help="JSON de référence pour détecter les régressions")
+    parser.add_argument('--seuil', type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument('--memoire', action='store_true',
+                        help="mesure aussi le pic mémoire (exécution tracée supplémentaire de chaque étape)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    rapport = {
+        'meta': {**metadata(), 'source': args.source, 'repetitions': args.repetitions, 'graine': args.graine, 'memoire': args.memoire},
+        'resultats': {}
+    }
+    for taille in args.tailles:
+        rapport['resultats'][taille] = run_size(taille, args.source, args.repertoire, args.repetitions, args.graine, args.memoire)
+
+    sortie = args.sortie or os.path.join(args.repertoire, f"bench_{rapport['meta']['commit'] or 'local'}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(sortie, 'w', encoding='utf-8') as f:
+        json.dump(rapport, f, indent=2, ensure_ascii=False)
+    logging.info("Résultats : %s", sortie)
+
+    if args.comparer:
+        with open(args.comparer, encoding='utf-8') as f:
+            regressions = compare(json.load(f), rapport, args.seuil)
+        for taille, nom, avant, apres, ratio in regressions:
+            logging.warning("Régression %s %s : %.3f s -> %.3f s (x%.2f)", taille, nom, avant, apres, ratio)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1 @@
+"""Couche données du dashboard de présence produits"""
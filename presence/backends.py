@@ -0,0 +1,162 @@
+"""Moteurs d'exécution des filtres et agrégations du cube : pandas (référence) ou DuckDB"""
+import logging
+import os
+
+import pandas as pd
+
+from presence.cube import CubeSelection, filter_cube
+
+BACKENDS = ('pandas', 'duckdb')
+
+logger = logging.getLogger(__name__)
+
+
+class PandasBackend:
+    """Filtres par masques booléens et agrégations ``groupby`` (chemin de référence)
+
+    ``sketches`` (``DailySketches``) sert les comptes distincts approximatifs des
+    sélections, quels que soient leurs filtres.
+    """
+
+    name = 'pandas'
+
+    def __init__(self, cube, sketches=None):
+        self.cube = cube
+        self.sketches = sketches
+
+    def select(self, date_range=None, marques=None, segments=None, zones=None):
+        filters = (date_range, marques, segments, zones)
+        return CubeSelection(filter_cube(self.cube, *filters), self.sketches, filters)
+
+
+class DuckDBBackend:
+    """Filtres et agrégations exécutés par DuckDB (vectorisé, multi-thread) sur le cube
+
+    Le cube est chargé une fois dans une base DuckDB en mémoire ; chaque requête
+    utilise son propre curseur, les sessions Streamlit peuvent donc interroger le
+    même moteur en parallèle.
+    """
+
+    name = 'duckdb'
+
+    def __init__(self, cube, threads=None):
+        import duckdb
+
+        self.cube = cube
+        self.connection = duckdb.connect()
+        if threads:
+            self.connection.execute(f"SET threads = {int(threads)}")
+        # Copie colonnaire du cube dans la base (les vues enregistrées ne sont pas visibles des curseurs)
+        self.connection.register('cube_pandas', cube)
+        self.connection.execute("CREATE TABLE cube AS SELECT * FROM cube_pandas")
+        self.connection.unregister('cube_pandas')
+
+    def select(self, date_range=None, marques=None, segments=None, zones=None):
+        return DuckDBSelection(self, date_range, marques, segments, zones)
+
+    def query(self, sql, params=None):
+        return self.connection.cursor().execute(sql, params or {}).df()
+
+
+class DuckDBSelection:
+    """Sélection filtrée exécutée par DuckDB ; même interface que ``CubeSelection``"""
+
+    def __init__(self, backend, date_range=None, marques=None, segments=None, zones=None):
+        self.backend = backend
+        conditions = []
+        self.params = {}
+
+        # Mêmes règles que ``filter_cube`` : bornes de dates incluses, liste vide = pas de filtre
+        if date_range is not None and len(date_range) == 2:
+            conditions.append("date BETWEEN $date_debut AND $date_fin")
+            self.params.update(date_debut=pd.Timestamp(date_range[0]), date_fin=pd.Timestamp(date_range[1]))
+        for col, valeurs in (('marque', marques), ('segment', segments), ('zone', zones)):
+            if valeurs:
+                conditions.append(f"list_contains(${col}s, CAST({col} AS VARCHAR))")
+                self.params[f"{col}s"] = [str(valeur) for valeur in valeurs]
+
+        self.where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    def rollup(self, keys, distinct=None):
+        """GROUP BY DuckDB ; même résultat (valeurs, types, ordre) que ``CubeSelection.rollup``"""
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        distinct = distinct or {}
+
+        select = [f'"{key}"' for key in keys]
+        select += ['SUM(observations) AS "Observations"', 'SUM(presences) AS "Presences"']
+        select += [f'COUNT(DISTINCT "{col}") AS "{name}"' for name, col in distinct.items()]
+        # Comme pandas, les groupes à clé manquante sont écartés
+        non_nulls = [f'"{key}" IS NOT NULL' for key in keys]
+        where = f"{self.where} AND {' AND '.join(non_nulls)}" if self.where else f"WHERE {' AND '.join(non_nulls)}"
+        group_by = ', '.join(f'"{key}"' for key in keys)
+
+        stats = self.backend.query(f"SELECT {', '.join(select)} FROM cube {where} GROUP BY {group_by}", self.params)
+        stats = self._restore_dtypes(stats, keys)
+        # L'ordre de groupby pandas suit les catégories (ordre interne du cube), puis les valeurs
+        stats = stats.sort_values(keys, kind='stable').set_index(keys)
+
+        stats['Observations'] = stats['Observations'].astype('int64')
+        stats['Presences'] = stats['Presences'].astype('int64')
+        stats['Taux_Presence'] = (stats['Presences'] / stats['Observations']).round(3)
+        for name in distinct:
+            stats[name] = stats[name].astype('int64')
+        return stats[['Observations', 'Presences', 'Taux_Presence', *distinct]]
+
+    def summarize(self, distinct=None, approximate=False):
+        """Totaux d'observations et de présences, et comptes distincts demandés (HyperLogLog de DuckDB si ``approximate``)"""
+        distinct = distinct or {}
+        compte = 'approx_count_distinct("{}")' if approximate else 'COUNT(DISTINCT "{}")'
+        select = ['COALESCE(SUM(observations), 0) AS observations', 'COALESCE(SUM(presences), 0) AS presences']
+        select += [f'{compte.format(col)} AS "{name}"' for name, col in distinct.items()]
+        ligne = self.backend.query(f"SELECT {', '.join(select)} FROM cube {self.where}", self.params).iloc[0]
+        return {name: int(ligne[name]) for name in ['observations', 'presences', *distinct]}
+
+    def _restore_dtypes(self, stats, keys):
+        """Reprend les types des clés du cube (catégories, entiers, dates)"""
+        for key in keys:
+            stats[key] = stats[key].astype(self.backend.cube[key].dtype)
+        return stats
+
+
+def create_backend(name, cube, threads=None, sketches=None):
+    """Moteur ``name`` pour le cube ; repli sur pandas si DuckDB n'est pas installé
+
+    ``sketches`` n'est utilisé que par le moteur pandas (DuckDB a son propre
+    ``approx_count_distinct``).
+    """
+    if name == 'duckdb':
+        try:
+            return DuckDBBackend(cube, threads)
+        except ImportError:
+            logger.warning("DuckDB n'est pas installé : repli sur le moteur pandas")
+    return PandasBackend(cube, sketches)
+
+
+def verify_equivalence(backend, filters_list, rollups=None, distinct=None):
+    """Compare les résultats d'un moteur au chemin pandas de référence
+
+    ``filters_list`` est une liste de ``(date_range, marques, segments, zones)`` ;
+    retourne la liste des écarts ``(filtres, agrégat, message)`` (vide si équivalent).
+    """
+    from presence.engine import KPI_DISTINCT, ROLLUPS
+
+    reference = PandasBackend(backend.cube)
+    ecarts = []
+    for filters in filters_list:
+        attendu, obtenu = reference.select(*filters), backend.select(*filters)
+        for name, (keys, rollup_distinct) in (rollups or ROLLUPS).items():
+            try:
+                pd.testing.assert_frame_equal(attendu.rollup(keys, rollup_distinct), obtenu.rollup(keys, rollup_distinct))
+            except AssertionError as e:
+                ecarts.append((filters, name, str(e)))
+        resume_attendu = attendu.summarize(distinct or KPI_DISTINCT)
+        resume_obtenu = obtenu.summarize(distinct or KPI_DISTINCT)
+        if resume_attendu != resume_obtenu:
+            ecarts.append((filters, 'resume', f"{resume_attendu} != {resume_obtenu}"))
+    return ecarts
+
+
+def default_threads():
+    """Nombre de threads du moteur (PRESENCE_BACKEND_THREADS, sinon tous les cœurs)"""
+    threads = os.environ.get("PRESENCE_BACKEND_THREADS")
+    return int(threads) if threads else None
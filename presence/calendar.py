@@ -0,0 +1,93 @@
+"""Dimension calendrier : attributs de date calculés une fois par jour distinct"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# Premier mois de l'exercice fiscal (1 = exercice calé sur l'année civile)
+FISCAL_YEAR_START_MONTH = 1
+
+# Jours fériés civils à date fixe (Maroc), en (mois, jour)
+FIXED_HOLIDAYS = (
+    (1, 1), (1, 11), (1, 14), (5, 1), (7, 30), (8, 14), (8, 20), (8, 21), (11, 6), (11, 18)
+)
+
+# Jours fériés mobiles (calendrier hégirien, dates retenues au Maroc) : Aïd al-Fitr (2 jours),
+# Aïd al-Adha (2 jours), Nouvel an de l'hégire, Aïd al-Mawlid (2 jours). Les années
+# suivantes sont ajoutées par la variable PRESENCE_MOVABLE_HOLIDAYS (dates séparées
+# par des virgules) dès l'annonce du ministère des Habous.
+MOVABLE_HOLIDAYS = (
+    '2024-04-10', '2024-04-11', '2024-06-17', '2024-06-18', '2024-07-08', '2024-09-16', '2024-09-17',
+    '2025-03-31', '2025-04-01', '2025-06-07', '2025-06-08', '2025-06-27', '2025-09-05', '2025-09-06'
+)
+
+CALENDAR_COLUMNS = [
+    'day_key', 'date', 'annee', 'mois', 'trimestre', 'semaine', 'annee_iso',
+    'jour_semaine', 'weekend', 'jour_ferie', 'annee_fiscale', 'periode_fiscale'
+]
+
+
+def day_keys(dates):
+    """Clé entière du jour (nombre de jours depuis 1970-01-01) ; -1 pour une date manquante"""
+    valeurs = pd.DatetimeIndex(dates).to_numpy().astype('datetime64[D]')
+    keys = valeurs.astype('int64')
+    keys[np.isnat(valeurs)] = -1
+    return keys.astype('int32')
+
+
+def movable_holidays():
+    """Jours fériés mobiles : dates connues et dates de ``PRESENCE_MOVABLE_HOLIDAYS``"""
+    ajoutes = [date.strip() for date in os.environ.get('PRESENCE_MOVABLE_HOLIDAYS', '').split(',') if date.strip()]
+    return pd.DatetimeIndex(list(MOVABLE_HOLIDAYS) + ajoutes)
+
+
+def build_calendar(keys):
+    """Calendrier des jours ``keys`` (une ligne par clé distincte, triées)"""
+    keys = np.sort(pd.unique(np.asarray(keys, dtype='int32')))
+    keys = keys[keys >= 0]
+    dates = pd.DatetimeIndex(keys.astype('datetime64[D]')).as_unit('us')
+    iso = dates.isocalendar()
+
+    feries = np.isin(dates.month * 100 + dates.day, [mois * 100 + jour for mois, jour in FIXED_HOLIDAYS])
+    feries |= dates.isin(movable_holidays())
+
+    # Exercice fiscal nommé d'après l'année civile de sa fin ; périodes (mois fiscaux) de 1 à 12
+    periode = (dates.month - FISCAL_YEAR_START_MONTH) % 12 + 1
+    annee_fiscale = dates.year
+    if FISCAL_YEAR_START_MONTH > 1:
+        annee_fiscale = annee_fiscale + (dates.month >= FISCAL_YEAR_START_MONTH)
+
+    return pd.DataFrame({
+        'day_key': keys,
+        'date': dates,
+        'annee': dates.year.astype('int16'),
+        'mois': dates.month.astype('int8'),
+        'trimestre': dates.quarter.astype('int8'),
+        'semaine': iso['week'].to_numpy().astype('int8'),
+        'annee_iso': iso['year'].to_numpy().astype('int16'),
+        'jour_semaine': pd.Categorical(dates.day_name()),
+        'weekend': dates.dayofweek >= 5,
+        'jour_ferie': feries,
+        'annee_fiscale': np.asarray(annee_fiscale, dtype='int16'),
+        'periode_fiscale': np.asarray(periode, dtype='int8')
+    })
+
+
+def merge_calendars(calendars):
+    """Calendrier couvrant l'union des jours de plusieurs calendriers"""
+    calendars = [calendar for calendar in calendars if len(calendar)]
+    if len(calendars) <= 1:
+        return calendars[0] if calendars else build_calendar([])
+    if all(calendar['day_key'].equals(calendars[0]['day_key']) for calendar in calendars[1:]):
+        return calendars[0]
+    return build_calendar(np.concatenate([calendar['day_key'].to_numpy() for calendar in calendars]))
+
+
+def calendar_positions(calendar, keys):
+    """Positions dans le calendrier des clés de jour ``keys`` (-1 si absente)"""
+    jours = calendar['day_key'].to_numpy()
+    positions = np.searchsorted(jours, keys)
+    trouvees = positions < len(jours)
+    trouvees[trouvees] = jours[positions[trouvees]] == keys[trouvees]
+    positions[~trouvees] = -1
+    return positions
@@ -0,0 +1,101 @@
+"""Ligne de commande : précalcul des agrégats d'une version des données
+
+Exemple (tâche nocturne) ::
+
+    python -m presence.cli precompute --instantane .cache/presence_snapshot.arrow
+
+Par défaut, la vue globale et la vue par défaut de la sidebar sont matérialisées ;
+``--debut/--fin/--marques/--segments/--zones`` ajoutent une sélection précise.
+
+``python -m presence.cli verify-backend --moteur duckdb`` compare les agrégats
+d'un moteur d'exécution au chemin pandas de référence.
+
+``--fichiers <répertoire>`` lit les exports CSV/Parquet au lieu de la base.
+"""
+import argparse
+import logging
+import time
+
+import pandas as pd
+
+from presence import engine
+from presence.backends import BACKENDS, create_backend, default_threads, verify_equivalence
+from presence.db import create_pooled_engine
+from presence.precompute import PRECOMPUTED_DIR, write_aggregates
+from presence.sources import FileSource
+
+
+def source(args):
+    """Exports sur disque (``--fichiers``) ou base SQL (``--url``)"""
+    return FileSource(args.fichiers) if args.fichiers else create_pooled_engine(args.url)
+
+
+def precompute(args):
+    debut = time.perf_counter()
+    dataset = engine.load(source(args), snapshot_path=args.instantane)
+    logging.info("Version %s : %s lignes chargées en %.1f s", dataset.version, f"{len(dataset.df):,}", time.perf_counter() - debut)
+
+    selections = [engine.Filters(), engine.default_filters(engine.options(dataset))]
+    if any([args.debut, args.fin, args.marques, args.segments, args.zones]):
+        options = engine.options(dataset)
+        date_range = (args.debut or options['date_min'].date(), args.fin or options['date_max'].date())
+        selections.append(engine.Filters(date_range, args.marques, args.segments, args.zones))
+
+    for filters in selections:
+        directory = write_aggregates(engine.select(dataset, filters), args.sortie, dataset.version, filters)
+        logging.info("Agrégats écrits dans %s", directory)
+    return 0
+
+
+def verify_backend(args):
+    dataset = engine.load(source(args), snapshot_path=args.instantane)
+    backend = create_backend(args.moteur, dataset.cube, default_threads())
+    if backend.name != args.moteur:
+        logging.error("Moteur %s indisponible", args.moteur)
+        return 1
+
+    # Vue globale, vue par défaut, puis chaque marque et chaque zone seule sur la moitié de la période
+    options = engine.options(dataset)
+    milieu = options['date_min'] + (options['date_max'] - options['date_min']) / 2
+    periode = (options['date_min'].date(), milieu.date())
+    selections = [engine.Filters(), engine.default_filters(options)]
+    selections += [engine.Filters(periode, [marque]) for marque in options['marque']]
+    selections += [engine.Filters(periode, None, None, [zone]) for zone in options['zone']]
+
+    ecarts = verify_equivalence(backend, selections)
+    for filters, name, message in ecarts:
+        logging.error("Écart %s pour %s :\n%s", name, filters, message)
+    logging.info("%d sélections comparées, %d écarts", len(selections), len(ecarts))
+    return 1 if ecarts else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m presence.cli", description="Moteur d'analyse de présence")
+    commandes = parser.add_subparsers(dest='commande', required=True)
+
+    parser_precompute = commandes.add_parser('precompute', help="matérialise les agrégats de la version courante")
+    parser_precompute.add_argument('--url', default=None, help="URL SQLAlchemy (défaut : DATABASE_URL)")
+    parser_precompute.add_argument('--fichiers', default=None, help="répertoire d'exports CSV/Parquet lu à la place de la base")
+    parser_precompute.add_argument('--instantane', default=None, help="instantané Arrow à reprendre et mettre à jour")
+    parser_precompute.add_argument('--sortie', default=PRECOMPUTED_DIR)
+    parser_precompute.add_argument('--debut', type=lambda d: pd.Timestamp(d).date(), default=None)
+    parser_precompute.add_argument('--fin', type=lambda d: pd.Timestamp(d).date(), default=None)
+    parser_precompute.add_argument('--marques', nargs='*', default=None)
+    parser_precompute.add_argument('--segments', nargs='*', default=None)
+    parser_precompute.add_argument('--zones', nargs='*', default=None)
+    parser_precompute.set_defaults(run=precompute)
+
+    parser_verify = commandes.add_parser('verify-backend', help="compare un moteur d'exécution au chemin pandas")
+    parser_verify.add_argument('--url', default=None, help="URL SQLAlchemy (défaut : DATABASE_URL)")
+    parser_verify.add_argument('--fichiers', default=None, help="répertoire d'exports CSV/Parquet lu à la place de la base")
+    parser_verify.add_argument('--instantane', default=None, help="instantané Arrow à reprendre et mettre à jour")
+    parser_verify.add_argument('--moteur', choices=BACKENDS, default='duckdb')
+    parser_verify.set_defaults(run=verify_backend)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    return args.run(args)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,119 @@
+"""Cube de présence pré-agrégé servant les graphiques et les KPIs"""
+import pandas as pd
+
+from presence.schema import append_rows
+from presence.star import StarTable
+
+# Grain du cube : jour × marque × segment × zone × produit × point de vente
+# (nom_produit, latitude et longitude dépendent fonctionnellement du produit / point de vente)
+CUBE_KEYS = [
+    'date', 'marque', 'segment', 'zone',
+    'product_id', 'nom_produit', 'nom_point_vente', 'latitude', 'longitude'
+]
+
+# Colonnes dont les comptes distincts des KPIs peuvent être servis par esquisses journalières
+SKETCH_COLUMNS = ['product_id', 'nom_point_vente', 'marque', 'segment', 'zone']
+
+
+def build_cube(table):
+    """Agrège les observations au grain du cube (nombre d'observations et de présences)
+
+    Le regroupement porte sur les clés entières des faits (``StarTable``), jour
+    compris ; les attributs des dimensions (date du calendrier, produits, points de
+    vente) sont résolus ensuite, sur les seules lignes du cube.
+    """
+    keys = ['day_key', 'segment', 'product_id', 'product_key', 'store_key']
+    cube = table.facts[keys + ['value']].groupby(keys, observed=True, dropna=False, sort=False)['value'].agg(
+        observations='count',
+        presences='sum'
+    ).reset_index()
+    cube['presences'] = cube['presences'].astype('int64')
+
+    attributs = StarTable(cube, table.dimensions)[['date', 'marque', 'zone', 'nom_produit', 'nom_point_vente', 'latitude', 'longitude']]
+    return pd.concat([cube[['observations', 'presences', 'segment', 'product_id']], attributs], axis=1)[CUBE_KEYS + ['observations', 'presences']]
+
+
+def merge_cubes(cube, delta_cube):
+    """Fusionne le cube d'un delta d'observations dans le cube existant"""
+    combined = append_rows(cube, delta_cube)
+    return combined.groupby(CUBE_KEYS, observed=True, dropna=False, sort=False)[['observations', 'presences']].sum().reset_index()
+
+
+def filter_cube(cube, date_range=None, marques=None, segments=None, zones=None):
+    """Applique les filtres de la sidebar au cube (bornes de dates incluses)"""
+    mask = pd.Series(True, index=cube.index)
+
+    if date_range is not None and len(date_range) == 2:
+        mask &= (cube['date'] >= pd.Timestamp(date_range[0])) & (cube['date'] <= pd.Timestamp(date_range[1]))
+    if marques:
+        mask &= cube['marque'].isin(marques)
+    if segments:
+        mask &= cube['segment'].isin(segments)
+    if zones:
+        mask &= cube['zone'].isin(zones)
+
+    return cube[mask]
+
+
+def rollup(cube, keys, distinct=None):
+    """Remonte le cube sur ``keys`` : Observations, Presences, Taux_Presence
+
+    ``distinct`` associe un nom de colonne de sortie à une colonne du cube dont on
+    compte les valeurs distinctes par groupe (ex. ``{'Nb_Produits': 'product_id'}``).
+    """
+    grouped = cube.groupby(keys, observed=True)
+    stats = grouped[['observations', 'presences']].sum()
+    stats.columns = ['Observations', 'Presences']
+    stats['Taux_Presence'] = (stats['Presences'] / stats['Observations']).round(3)
+
+    for name, col in (distinct or {}).items():
+        stats[name] = grouped[col].nunique()
+
+    return stats
+
+
+def filter_options(cube):
+    """Bornes de dates et modalités proposées dans la sidebar"""
+    options = {'date_min': cube['date'].min(), 'date_max': cube['date'].max()}
+    for col in ('marque', 'segment', 'zone'):
+        options[col] = sorted(cube[col].dropna().unique())
+    return options
+
+
+class CubeSelection:
+    """Sélection filtrée du cube en mémoire
+
+    Expose la même interface que ``presence.pushdown.PushdownSelection`` : les
+    graphiques et KPIs ne dépendent pas du mode d'exécution.
+
+    ``sketches`` (``DailySketches`` du cube complet) sert les comptes distincts
+    approximatifs : les esquisses des partitions retenues par ``filters``
+    (``(date_range, marques, segments, zones)``) sont fusionnées.
+    """
+
+    def __init__(self, cube, sketches=None, filters=()):
+        self.cube = cube
+        self.sketches = sketches
+        self.filters = tuple(filters)
+
+    def rollup(self, keys, distinct=None):
+        """Remonte la sélection sur ``keys`` (voir ``rollup``)"""
+        return rollup(self.cube, keys, distinct)
+
+    def summarize(self, distinct=None, approximate=False):
+        """Totaux d'observations et de présences, et comptes distincts demandés
+
+        Si ``approximate`` et que des esquisses couvrent la sélection, les comptes
+        sont estimés par HyperLogLog ; ils sont exacts sinon (un ``nunique`` sur
+        le cube filtré reste plus rapide qu'une esquisse construite à la volée).
+        """
+        resume = {
+            'observations': int(self.cube['observations'].sum()),
+            'presences': int(self.cube['presences'].sum())
+        }
+        for name, col in (distinct or {}).items():
+            if approximate and self.sketches is not None and col in self.sketches.columns:
+                resume[name] = self.sketches.count(col, *self.filters)
+            else:
+                resume[name] = self.cube[col].nunique()
+        return resume
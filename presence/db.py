@@ -0,0 +1,28 @@
+"""Moteur de base de données partagé, configuré depuis l'environnement (.env)"""
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+
+def create_pooled_engine(url=None):
+    """Crée le moteur SQLAlchemy du processus (pool de connexions + pre-ping)
+
+    Les paramètres sont lus dans l'environnement, complété par le fichier ``.env`` :
+    ``DATABASE_URL``, ``DB_POOL_SIZE``, ``DB_MAX_OVERFLOW``, ``DB_POOL_RECYCLE``.
+    """
+    load_dotenv()
+    url = url or os.environ.get("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DATABASE_URL n'est pas défini (variable d'environnement ou fichier .env)")
+
+    options = {'pool_pre_ping': True}
+    if make_url(url).get_backend_name() != 'sqlite':
+        options.update(
+            pool_size=int(os.environ.get("DB_POOL_SIZE", 5)),
+            max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", 5)),
+            pool_recycle=int(os.environ.get("DB_POOL_RECYCLE", 1800))
+        )
+    return create_engine(url, **options)
+
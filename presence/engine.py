@@ -0,0 +1,152 @@
+"""Moteur d'analyse de présence sans interface : chargement → enrichissement → filtre → agrégats
+
+L'interface Streamlit, le banc d'essai et la ligne de commande (``presence.cli``)
+passent par ces fonctions ; une « sélection » est un ``CubeSelection`` (mémoire),
+un ``PushdownSelection`` (base) ou un ``PrecomputedSelection`` (agrégats sur disque).
+"""
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from presence.backends import PandasBackend
+from presence.cube import filter_options
+from presence.filters import FilterIndex
+from presence.geo import MAX_MARKERS, GeoGrid, bin_points
+from presence.loader import Dataset, IncrementalLoader
+from presence.ranking import bottom_k, top_k
+from presence.timeseries import choose_granularity, resample_stats
+
+DEFAULT_MARQUES = 10  # marques présélectionnées dans la sidebar
+TOP_MARQUES = 15
+TOP_PRODUITS = 10  # top / bottom K de l'analyse par produit
+
+# Agrégats du dashboard : nom -> (clés, comptes distincts) passés à ``selection.rollup``
+ROLLUPS = {
+    'marques': (['marque'], {'Nb_Produits': 'product_id'}),
+    'segments': (['segment'], {}),
+    'zones': (['zone'], {'Nb_Points_Vente': 'nom_point_vente'}),
+    'produits': (['nom_produit', 'marque'], {}),
+    'geo': (['zone', 'latitude', 'longitude'], {}),
+    'jours': (['date'], {})
+}
+
+# Comptes distincts des KPIs
+KPI_DISTINCT = {
+    'nb_produits': 'product_id',
+    'nb_points_vente': 'nom_point_vente',
+    'nb_marques': 'marque',
+    'nb_segments': 'segment',
+    'nb_zones': 'zone'
+}
+
+
+class Filters(NamedTuple):
+    """Sélection de la sidebar ; un champ vide (None, liste vide) ne filtre pas"""
+    date_range: Optional[Tuple] = None
+    marques: Optional[List[str]] = None
+    segments: Optional[List[str]] = None
+    zones: Optional[List[str]] = None
+
+    def key(self) -> tuple:
+        """Forme canonique (hachable) des filtres"""
+        return FilterIndex.key(*self)
+
+
+def load(source, snapshot_path: Optional[str] = None, **loader_options) -> Dataset:
+    """Charge (ou rattrape depuis l'instantané) le jeu enrichi et son cube
+
+    ``source`` : moteur SQLAlchemy ou source de ``presence.sources`` (fichiers d'export).
+    """
+    loader = IncrementalLoader(snapshot_path=snapshot_path, **loader_options)
+    loader.refresh(source)
+    return loader.current
+
+
+def default_filters(options: dict) -> Filters:
+    """Filtres par défaut de la sidebar : toute la période, les premières marques"""
+    return Filters(
+        (options['date_min'].date(), options['date_max'].date()),
+        list(options['marque'][:DEFAULT_MARQUES]),
+        list(options['segment']),
+        list(options['zone'])
+    )
+
+
+def select(dataset: Dataset, filters: Filters = Filters(), backend=None):
+    """Sélection du cube correspondant aux filtres (pandas, ou ``backend`` de ``presence.backends``)"""
+    if backend is None:
+        backend = PandasBackend(dataset.cube, dataset.sketches)
+    return backend.select(*filters)
+
+
+def options(dataset: Dataset) -> dict:
+    """Bornes de dates et modalités des filtres"""
+    return filter_options(dataset.cube)
+
+
+def kpis(selection, approximate: bool = False) -> Dict[str, float]:
+    """KPIs principaux : volumes, taux de présence global (%) et comptes distincts
+
+    ``approximate`` : comptes distincts par esquisses HyperLogLog (``presence.sketch``)
+    quand le moteur le permet, exacts sinon.
+    """
+    resume = selection.summarize(KPI_DISTINCT, approximate=approximate)
+    total_observations = resume['observations']
+    total_presences = resume['presences']
+    return {
+        'total_observations': total_observations,
+        'total_presences': total_presences,
+        'taux_presence_global': (total_presences / total_observations) * 100 if total_observations > 0 else 0,
+        **{name: resume[name] for name in KPI_DISTINCT}
+    }
+
+
+def aggregate(selection, name: str) -> pd.DataFrame:
+    """Agrégat ``name`` de ``ROLLUPS``, indexé par ses clés"""
+    keys, distinct = ROLLUPS[name]
+    return selection.rollup(keys, distinct)
+
+
+def brand_stats(selection, top: int = TOP_MARQUES, ties: str = 'first') -> pd.DataFrame:
+    """Marques les mieux couvertes (taux de présence décroissant, sélection partielle)"""
+    return top_k(aggregate(selection, 'marques'), 'Taux_Presence', top, ties=ties)
+
+
+def segment_stats(selection) -> pd.DataFrame:
+    """Taux de présence par segment (croissant, pour un graphique horizontal)"""
+    return aggregate(selection, 'segments').sort_values('Taux_Presence', ascending=True)
+
+
+def zone_stats(selection) -> pd.DataFrame:
+    """Taux de présence et nombre de points de vente par zone (décroissant)"""
+    return aggregate(selection, 'zones').reset_index().sort_values('Taux_Presence', ascending=False)
+
+
+def product_ranking(stats: pd.DataFrame, k: int = TOP_PRODUITS, ties: str = 'first') -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Top K et bottom K des produits de ``aggregate(selection, 'produits')`` sans tri complet
+
+    Le bottom K est classé du plus faible taux de présence au moins faible.
+    """
+    return top_k(stats, 'Taux_Presence', k, ties=ties), bottom_k(stats, 'Taux_Presence', k, ties=ties)
+
+
+def geo_stats(selection, max_markers: int = MAX_MARKERS, grid: Optional[GeoGrid] = None,
+              filters: Filters = Filters()) -> Tuple[pd.DataFrame, Optional[float]]:
+    """Points de vente géolocalisés, regroupés en cellules au-delà de ``max_markers``
+
+    Si ``grid`` (``GeoGrid`` de la version courante) est fourni, les totaux sont
+    lus dans la grille pour les ``filters`` de la sélection au lieu du cube.
+    """
+    if grid is not None:
+        return grid.stats(filters, max_markers)
+    points = aggregate(selection, 'geo')
+    if len(points) == 0:
+        return points.reset_index(), None
+    return bin_points(points.reset_index(), max_markers)
+
+
+def time_stats(selection) -> Tuple[pd.DataFrame, str]:
+    """Série temporelle à la granularité adaptée à l'étendue de la sélection"""
+    daily_stats = aggregate(selection, 'jours').reset_index()
+    granularite = choose_granularity(daily_stats['date'].min(), daily_stats['date'].max())
+    return resample_stats(daily_stats, granularite), granularite
@@ -0,0 +1,97 @@
+"""Explorateur paginé des observations : tri, recherche et découpage côté serveur"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Colonnes textuelles couvertes par la recherche
+SEARCH_COLUMNS = ('marque', 'segment', 'zone', 'nom_produit', 'nom_point_vente')
+PAGE_SIZES = (50, 100, 500)
+ORDER_CACHE_MB = 32  # ordres mémorisés par explorateur (positions int32 : ~8M lignes)
+
+
+class Explorer:
+    """Pagine un jeu d'observations sans jamais sérialiser plus d'une page
+
+    L'ordre des lignes (recherche + tri) est calculé une fois par combinaison
+    ``(tri, sens, recherche)`` et mémorisé sous forme de positions ; afficher
+    une page ne coûte ensuite qu'un découpage et un ``take`` de ``page_size`` lignes.
+    Sans recherche ni tri, la page est découpée directement (aucun ordre n'est
+    construit). Les ordres mémorisés sont plafonnés à ``max_order_mb`` Mo au total.
+    La recherche et le tri des colonnes catégorielles travaillent sur les
+    modalités (peu nombreuses) plutôt que sur les lignes.
+    """
+
+    def __init__(self, df, max_order_mb=ORDER_CACHE_MB):
+        self.df = df
+        self.columns = list(df.columns)
+        self._orders = OrderedDict()
+        self._orders_bytes = 0
+        self._max_order_bytes = max_order_mb * 1024 ** 2
+        self._lock = threading.Lock()
+
+    def page(self, page, page_size, sort_by=None, ascending=True, search='', columns=None):
+        """Retourne ``(lignes de la page, nombre total de lignes)``"""
+        search = (search or '').strip().lower()
+        debut = page * page_size
+        if not sort_by and not search:
+            positions, total = np.arange(debut, min(debut + page_size, len(self.df))), len(self.df)
+        else:
+            order = self._order(sort_by, ascending, search)
+            positions, total = order[debut:debut + page_size], len(order)
+        lignes = self.df.take(positions)
+        return lignes[list(columns or self.columns)], total
+
+    def _order(self, sort_by, ascending, search):
+        key = (sort_by, ascending, search)
+        with self._lock:
+            if key in self._orders:
+                self._orders.move_to_end(key)
+                return self._orders[key]
+
+        positions = self._search(search) if search else np.arange(len(self.df))
+        if sort_by:
+            keys = self._sort_keys(sort_by)[positions]
+            positions = positions[np.argsort(keys if ascending else -keys, kind='stable')]
+        if len(self.df) < 2 ** 31:
+            positions = positions.astype(np.int32)
+
+        with self._lock:
+            if key not in self._orders and positions.nbytes <= self._max_order_bytes:
+                self._orders[key] = positions
+                self._orders_bytes += positions.nbytes
+                while self._orders_bytes > self._max_order_bytes:
+                    self._orders_bytes -= self._orders.popitem(last=False)[1].nbytes
+        return positions
+
+    def _search(self, search):
+        """Positions des lignes dont une colonne textuelle contient ``search``"""
+        mask = np.zeros(len(self.df), dtype=bool)
+        for col in SEARCH_COLUMNS:
+            if col not in self.df.columns:
+                continue
+            valeurs = self.df[col]
+            if isinstance(valeurs.dtype, pd.CategoricalDtype):
+                # Test sur les modalités puis report sur les codes
+                trouvees = valeurs.cat.categories.astype(str).str.lower().str.contains(search, regex=False)
+                table = np.append(np.asarray(trouvees, dtype=bool), False)
+                mask |= table[valeurs.cat.codes.to_numpy()]
+            else:
+                mask |= valeurs.astype(str).str.lower().str.contains(search, regex=False).to_numpy()
+        return np.flatnonzero(mask)
+
+    def _sort_keys(self, col):
+        """Clés de tri numériques (NaN pour les valeurs manquantes, toujours en fin)"""
+        valeurs = self.df[col]
+        if isinstance(valeurs.dtype, pd.CategoricalDtype):
+            # Rang alphabétique des modalités (leur ordre interne suit l'ordre d'arrivée)
+            rang = np.empty(len(valeurs.cat.categories), dtype='float64')
+            rang[np.argsort(valeurs.cat.categories.astype(str))] = np.arange(len(rang))
+            codes = valeurs.cat.codes.to_numpy()
+            keys = np.append(rang, np.nan)[codes]
+        else:
+            codes, _ = pd.factorize(valeurs, sort=True)
+            keys = codes.astype('float64')
+            keys[codes < 0] = np.nan
+        return keys
@@ -0,0 +1,189 @@
+"""Export en flux des observations et des agrégats (CSV, Parquet, Excel)"""
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xlsxwriter
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx')
+}
+EXPORT_CHUNK_ROWS = 100_000
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "presence_exports")
+EXCEL_MAX_ROWS = 1_048_575  # lignes de données par feuille (hors en-tête)
+EXPORT_MAX_AGE_S = 24 * 3600  # fichiers abandonnés (session fermée sans téléchargement) supprimés au-delà
+
+
+def iter_chunks(source, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Découpe la source en blocs : DataFrame (tranches sans copie) ou sélection en base"""
+    if isinstance(source, pd.DataFrame):
+        for debut in range(0, len(source), chunk_rows):
+            yield source.iloc[debut:debut + chunk_rows]
+    else:
+        yield from source.iter_chunks(chunk_rows)
+
+
+def arrow_schema(source):
+    """Schéma Parquet de la source, fixé avant l'écriture du premier bloc
+
+    Il vient des types de la source et non des valeurs d'un bloc : un premier
+    bloc entièrement vide ou entier ne fige pas le type d'une colonne.
+    """
+    if isinstance(source, pd.DataFrame):
+        return pa.Schema.from_pandas(source, preserve_index=False)
+    return source.arrow_schema()
+
+
+def write_csv(chunks, path):
+    """Écrit les blocs dans un CSV, l'en-tête une seule fois"""
+    lignes = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, header=(i == 0), index=False)
+            lignes += len(chunk)
+    return lignes
+
+
+def write_parquet(chunks, path, schema):
+    """Écrit chaque bloc comme un groupe de lignes Parquet, converti vers ``schema``"""
+    lignes = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            lignes += len(chunk)
+    return lignes
+
+
+def write_excel(chunks, path):
+    """Écrit les blocs en mode mémoire constante de xlsxwriter (nouvelle feuille tous les ~1M lignes)"""
+    lignes = 0
+    workbook = xlsxwriter.Workbook(path, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+        'remove_timezone': True
+    })
+    try:
+        worksheet, ligne_feuille, colonnes = None, 0, None
+        for chunk in chunks:
+            if colonnes is None:
+                colonnes = [str(col) for col in chunk.columns]
+            valeurs = chunk.astype(object).where(chunk.notna(), None)
+            for row in valeurs.itertuples(index=False, name=None):
+                if worksheet is None or ligne_feuille > EXCEL_MAX_ROWS:
+                    worksheet = workbook.add_worksheet(f"Données {len(workbook.worksheets()) + 1}")
+                    worksheet.write_row(0, 0, colonnes)
+                    ligne_feuille = 1
+                worksheet.write_row(ligne_feuille, 0, row)
+                ligne_feuille += 1
+            lignes += len(chunk)
+        if worksheet is None:
+            workbook.add_worksheet("Données 1").write_row(0, 0, colonnes or [])
+    finally:
+        workbook.close()
+    return lignes
+
+
+WRITERS = {'csv': write_csv, 'parquet': write_parquet, 'xlsx': write_excel}
+
+
+def purge_exports(export_dir=EXPORT_DIR, max_age_s=EXPORT_MAX_AGE_S):
+    """Supprime les fichiers d'export plus anciens que ``max_age_s`` (le journal est gardé)"""
+    limite = time.time() - max_age_s
+    for entree in os.scandir(export_dir):
+        if entree.is_file() and entree.name != "exports.jsonl" and entree.stat().st_mtime < limite:
+            try:
+                os.remove(entree.path)
+            except OSError:
+                pass
+
+
+def export(source, fmt, nom, chunk_rows=EXPORT_CHUNK_ROWS, export_dir=EXPORT_DIR):
+    """Exporte la source dans un fichier ; retourne les statistiques (lignes, durée, taille)
+
+    Le répertoire d'export est partagé par les sessions : chaque export écrit
+    dans un fichier de nom unique (``chemin``) ; ``fichier`` est le nom proposé
+    au téléchargement. Chaque export est aussi consigné dans ``exports.jsonl``
+    du répertoire d'export.
+    """
+    os.makedirs(export_dir, exist_ok=True)
+    purge_exports(export_dir)
+    options = {'schema': arrow_schema(source)} if fmt == 'parquet' else {}
+    horodatage = datetime.now()
+    extension = EXPORT_FORMATS[fmt][1]
+    fd, path = tempfile.mkstemp(prefix=f"{nom}_{horodatage:%Y%m%d_%H%M%S}_", suffix=f".{extension}", dir=export_dir)
+    os.close(fd)
+
+    debut = time.perf_counter()
+    try:
+        lignes = WRITERS[fmt](iter_chunks(source, chunk_rows), path, **options)
+    except BaseException:
+        os.remove(path)
+        raise
+    stats = {
+        'nom': nom,
+        'format': fmt,
+        'chemin': path,
+        'fichier': f"{nom}_{horodatage:%Y%m%d_%H%M%S}.{extension}",
+        'lignes': lignes,
+        'duree_s': round(time.perf_counter() - debut, 3),
+        'octets': os.path.getsize(path),
+        'horodatage': horodatage.isoformat(timespec='seconds')
+    }
+
+    with open(os.path.join(export_dir, "exports.jsonl"), 'a', encoding='utf-8') as log:
+        log.write(json.dumps(stats) + "\n")
+    return stats
+
+
+class ExportJob:
+    """Export exécuté dans un thread pour ne pas bloquer la session
+
+    ``discard`` supprime le fichier produit (après téléchargement ou au lancement
+    de l'export suivant) ; appelé pendant l'export, il le supprime dès sa fin.
+    """
+
+    def __init__(self, source, fmt, nom, chunk_rows=EXPORT_CHUNK_ROWS, export_dir=EXPORT_DIR):
+        self.fmt = fmt
+        self.nom = nom
+        self.stats = None
+        self.erreur = None
+        self.discarded = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, args=(source, chunk_rows, export_dir), name=f"export-{nom}", daemon=True)
+        self._thread.start()
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+    def discard(self):
+        """Supprime le fichier exporté ; le job n'est plus téléchargeable"""
+        with self._lock:
+            self.discarded = True
+            if self.stats is not None:
+                self._remove()
+
+    def _remove(self):
+        try:
+            os.remove(self.stats['chemin'])
+        except FileNotFoundError:
+            pass
+
+    def _run(self, source, chunk_rows, export_dir):
+        try:
+            stats = export(source, self.fmt, self.nom, chunk_rows, export_dir)
+        except Exception as e:
+            self.erreur = str(e)
+            return
+        with self._lock:
+            self.stats = stats
+            if self.discarded:
+                self._remove()
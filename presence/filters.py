@@ -0,0 +1,103 @@
+"""Moteur de filtrage indexé des observations"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from presence.schema import memory_usage_mb
+
+FILTER_COLUMNS = ('marque', 'segment', 'zone')
+MEMO_MB = 256  # sélections filtrées mémorisées par index (faits copiés par ``take``)
+
+
+class FilterIndex:
+    """Index de filtrage construit une fois par version des données
+
+    - les dates de référence sont triées une fois : une période devient une
+      tranche contiguë de positions (``searchsorted``) ;
+    - marque, segment et zone sont indexés par leurs codes de catégorie : une
+      sélection devient une table de correspondance code → bool appliquée
+      aux seules positions de la période, puis un unique ``take``.
+
+    Les résultats sont mémorisés par tuple de filtres (LRU borné à ``max_entries``
+    sélections et ``max_memo_mb`` Mo de copies) ; le jeu source n'est jamais modifié.
+    """
+
+    def __init__(self, df, max_entries=8, max_memo_mb=MEMO_MB):
+        self.df = df
+        dates = df['date_reference'].to_numpy()
+        self._order = np.argsort(dates, kind='stable')
+        self._sorted_dates = dates[self._order]
+        self._codes = {}
+        self._categories = {}
+        for col in FILTER_COLUMNS:
+            valeurs = df[col].astype('category')
+            self._codes[col] = valeurs.cat.codes.to_numpy()
+            self._categories[col] = valeurs.cat.categories
+        self._memo = OrderedDict()
+        self._memo_mb = 0.0
+        self._max_entries = max_entries
+        self._max_memo_mb = max_memo_mb
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(date_range, marques, segments, zones):
+        """Forme canonique (hachable) d'une sélection de filtres"""
+        periode = tuple(pd.Timestamp(d) for d in date_range) if date_range is not None and len(date_range) == 2 else None
+        return (
+            periode,
+            tuple(sorted(marques or [])),
+            tuple(sorted(segments or [])),
+            tuple(sorted(zones or []))
+        )
+
+    def filter(self, date_range=None, marques=None, segments=None, zones=None):
+        """Retourne les observations correspondant aux filtres de la sidebar"""
+        key = self.key(date_range, marques, segments, zones)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key][0]
+
+        positions = self.positions(*key)
+        # Sélection complète : le jeu partagé est retourné tel quel, sans copie
+        result = self.df if len(positions) == len(self.df) else self.df.take(positions)
+
+        taille = 0.0 if result is self.df else self._size_mb(result)
+        with self._lock:
+            if key not in self._memo and taille <= self._max_memo_mb:
+                self._memo[key] = (result, taille)
+                self._memo_mb += taille
+                while len(self._memo) > self._max_entries or self._memo_mb > self._max_memo_mb:
+                    self._memo_mb -= self._memo.popitem(last=False)[1][1]
+        return result
+
+    @staticmethod
+    def _size_mb(result):
+        """Empreinte d'une sélection copiée ; les dimensions d'une ``StarTable`` sont partagées"""
+        return memory_usage_mb(getattr(result, 'facts', result))
+
+    def positions(self, periode, marques, segments, zones):
+        """Calcule les positions (triées) des lignes retenues"""
+        if periode is not None:
+            # La date de fin est incluse en entier
+            debut = np.searchsorted(self._sorted_dates, np.datetime64(periode[0]), side='left')
+            fin = np.searchsorted(self._sorted_dates, np.datetime64(periode[1] + pd.Timedelta(days=1)), side='left')
+            positions = self._order[debut:fin]
+        else:
+            positions = self._order
+
+        for col, selection in zip(FILTER_COLUMNS, (marques, segments, zones)):
+            if selection:
+                positions = positions[self._lookup(col, selection)[self._codes[col][positions]]]
+
+        return np.sort(positions)
+
+    def _lookup(self, col, selection):
+        """Table code → sélectionné ; le dernier élément couvre le code -1 (valeur manquante)"""
+        categories = self._categories[col]
+        table = np.zeros(len(categories) + 1, dtype=bool)
+        codes = categories.get_indexer(list(selection))
+        table[codes[codes >= 0]] = True
+        return table
@@ -0,0 +1,109 @@
+"""Agrégation spatiale des points de vente en cellules de grille"""
+import numpy as np
+
+from presence.cube import filter_cube
+
+# Tailles de cellule candidates (degrés), de la plus fine à la plus grossière
+GRID_SIZES_DEG = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0)
+MAX_MARKERS = 500
+
+
+def choose_grid_size(points, max_markers=MAX_MARKERS):
+    """Plus petite taille de cellule donnant au plus ``max_markers`` cellules"""
+    lat = points['latitude'].to_numpy()
+    lon = points['longitude'].to_numpy()
+    for taille in GRID_SIZES_DEG:
+        cellules = np.unique(np.stack([np.floor(lat / taille), np.floor(lon / taille)]), axis=1).shape[1]
+        if cellules <= max_markers:
+            return taille
+    return GRID_SIZES_DEG[-1]
+
+
+def bin_points(points, max_markers=MAX_MARKERS, taille=None):
+    """Regroupe les points (zone, latitude, longitude, Observations, Presences) en cellules
+
+    Retourne ``(cellules, taille)`` ; s'il reste au plus ``max_markers`` points
+    après filtrage, ils sont retournés tels quels avec une taille ``None``.
+    Chaque cellule est placée au barycentre de ses points pondéré par les
+    observations et porte le nombre de points de vente qu'elle regroupe.
+    ``taille`` (degrés) impose la taille de cellule au lieu de la choisir.
+    """
+    if len(points) <= max_markers:
+        return points, None
+
+    taille = taille or choose_grid_size(points, max_markers)
+    points = points.assign(
+        cellule_lat=np.floor(points['latitude'] / taille),
+        cellule_lon=np.floor(points['longitude'] / taille),
+        lat_pond=points['latitude'] * points['Observations'],
+        lon_pond=points['longitude'] * points['Observations']
+    )
+
+    grouped = points.groupby(['cellule_lat', 'cellule_lon'])
+    cellules = grouped[['Observations', 'Presences', 'lat_pond', 'lon_pond']].sum()
+    cellules['Nb_Points_Vente'] = grouped.size()
+    zones = grouped['zone'].agg(lambda z: z.iloc[0] if z.nunique() == 1 else f"{z.nunique()} zones")
+    cellules['zone'] = zones
+
+    cellules['latitude'] = cellules['lat_pond'] / cellules['Observations']
+    cellules['longitude'] = cellules['lon_pond'] / cellules['Observations']
+    cellules['Taux_Presence'] = (cellules['Presences'] / cellules['Observations']).round(3)
+
+    colonnes = ['zone', 'latitude', 'longitude', 'Observations', 'Presences', 'Taux_Presence', 'Nb_Points_Vente']
+    return cellules.reset_index()[colonnes], taille
+
+
+class GeoGrid:
+    """Totaux des points géolocalisés par partition de filtres, calculés une fois par version
+
+    ``totals`` remonte le cube au grain jour × marque × segment × zone × point
+    (zone, latitude, longitude) ; ``cells`` donne, pour chaque taille de
+    ``GRID_SIZES_DEG``, le code de cellule de chaque point. Une sélection ne
+    filtre plus que ces totaux : les points retenus sont sommés par ``bincount``
+    et la taille de cellule est choisie sur les codes précalculés.
+    """
+
+    def __init__(self, cube):
+        geo = cube[cube[['zone', 'latitude', 'longitude']].notna().all(axis=1).to_numpy()]
+        # Même ordre que ``rollup`` sur (zone, latitude, longitude)
+        grouped = geo.groupby(['zone', 'latitude', 'longitude'], observed=True, sort=True)
+        self.points = grouped.size().index.to_frame(index=False)
+        self.totals = geo[['date', 'marque', 'segment', 'zone', 'observations', 'presences']].assign(
+            point=grouped.ngroup().to_numpy(np.int32)
+        ).groupby(['date', 'marque', 'segment', 'zone', 'point'], observed=True, dropna=False, sort=False)[
+            ['observations', 'presences']
+        ].sum().reset_index()
+
+        lat = self.points['latitude'].to_numpy()
+        lon = self.points['longitude'].to_numpy()
+        self.cells = {
+            taille: np.unique(np.stack([np.floor(lat / taille), np.floor(lon / taille)]), axis=1, return_inverse=True)[1].ravel()
+            for taille in GRID_SIZES_DEG
+        }
+
+    def point_stats(self, date_range=None, marques=None, segments=None, zones=None):
+        """Points retenus par les filtres (mêmes colonnes que l'agrégat ``geo`` remis à plat)"""
+        retenues = filter_cube(self.totals, date_range, marques, segments, zones)
+        point = retenues['point'].to_numpy()
+        n = len(self.points)
+        lignes = np.bincount(point, minlength=n)
+        observations = np.bincount(point, weights=retenues['observations'].to_numpy(), minlength=n)
+        presences = np.bincount(point, weights=retenues['presences'].to_numpy(), minlength=n)
+
+        actifs = np.flatnonzero(lignes > 0)
+        points = self.points.iloc[actifs].reset_index(drop=True)
+        points['Observations'] = observations[actifs].astype('int64')
+        points['Presences'] = presences[actifs].astype('int64')
+        points['Taux_Presence'] = (points['Presences'] / points['Observations']).round(3)
+        return points, actifs
+
+    def stats(self, filters=(), max_markers=MAX_MARKERS):
+        """Points ou cellules de la sélection ``filters`` (voir ``bin_points``)"""
+        points, actifs = self.point_stats(*filters)
+        if len(points) <= max_markers:
+            return points, None
+        taille = next(
+            (taille for taille in GRID_SIZES_DEG if len(np.unique(self.cells[taille][actifs])) <= max_markers),
+            GRID_SIZES_DEG[-1]
+        )
+        return bin_points(points, max_markers, taille)
@@ -0,0 +1,102 @@
+"""Ingestion en flux des observations, par blocs, avec plafond mémoire"""
+import pandas as pd
+
+from presence.schema import memory_usage_mb
+from presence.star import build_dimensions, concat_tables, encode_facts, with_calendar
+
+DEFAULT_CHUNK_ROWS = 100_000
+MIN_CHUNK_ROWS = 1_000
+
+
+def enrich(tracking, produits, points_de_vente, report=None):
+    """Code les observations en modèle en étoile (faits + dimensions produits, points de vente, calendrier)
+
+    Les attributs des dimensions ne sont pas recopiés sur chaque observation : ils
+    sont résolus à la demande (voir ``StarTable``). Si ``report`` est un dict, il
+    reçoit la mémoire des lignes brutes et des faits compactés (Mo).
+    """
+    return encode(tracking, build_dimensions(produits, points_de_vente), report)
+
+
+def encode(tracking, dimensions, report=None):
+    """Code un bloc d'observations brutes avec des dimensions déjà construites"""
+    if report is not None:
+        report['avant_mo'] = memory_usage_mb(tracking)
+    table = with_calendar(encode_facts(tracking, dimensions), dimensions)
+    if report is not None:
+        report['apres_mo'] = memory_usage_mb(table.facts)
+    return table
+
+
+def ingest(reader, dimensions, chunk_rows=DEFAULT_CHUNK_ROWS, memory_limit_mb=None):
+    """Lit les observations par blocs et les enrichit au fil de l'eau
+
+    ``reader`` est le lecteur en flux d'une source (``presence.sources``) :
+    gestionnaire de contexte fournissant ``fetch(n)``, qui retourne les ``n``
+    lignes suivantes (DataFrame vide en fin de flux).
+
+    Chaque bloc est codé en faits (clés entières des dimensions) puis compacté
+    avant la lecture du suivant : seuls un bloc brut et les faits déjà compactés
+    sont en mémoire. ``dimensions`` est appelé à la réception du premier bloc et
+    retourne les ``Dimensions`` ; la requête démarre donc pendant leur lecture.
+
+    Si ``memory_limit_mb`` est fourni, la taille des blocs est réduite pour tenir
+    dans le budget restant (blocs compactés + concaténation finale + bloc en
+    cours) ; ``MemoryError`` est levée si le budget est épuisé.
+
+    Retourne ``(table, stats)`` (``StarTable``) ; ``stats`` contient le nombre de lignes et de blocs,
+    la mémoire avant/après compactage et le dernier ``id``/``created_on`` vus.
+    """
+    stats = {'lignes': 0, 'blocs': 0, 'avant_mo': 0.0, 'apres_mo': 0.0, 'max_id': None, 'max_created_on': None}
+    morceaux = []
+    dims = None
+    taille_bloc = chunk_rows
+
+    with reader as fetch:
+        while True:
+            bloc = fetch(taille_bloc)
+            if len(bloc) == 0:
+                break
+
+            if dims is None:
+                dims = dimensions()
+
+            _advance(stats, bloc)
+            report = {}
+            morceaux.append(encode(bloc, dims, report=report))
+            stats['lignes'] += len(bloc)
+            stats['blocs'] += 1
+            stats['avant_mo'] += report['avant_mo']
+            stats['apres_mo'] += report['apres_mo']
+
+            if memory_limit_mb is not None:
+                taille_bloc = _next_chunk_rows(stats, report['avant_mo'] / len(bloc), chunk_rows, memory_limit_mb)
+            del bloc
+
+    if not morceaux:
+        return encode(bloc, dims if dims is not None else dimensions()), stats
+
+    return concat_tables(morceaux), stats
+
+
+def _advance(stats, bloc):
+    """Met à jour le dernier id et la dernière date de création vus"""
+    max_id = int(bloc['id'].max())
+    max_created_on = pd.to_datetime(bloc['created_on']).max()
+    if stats['max_id'] is None or max_id > stats['max_id']:
+        stats['max_id'] = max_id
+    if stats['max_created_on'] is None or max_created_on > stats['max_created_on']:
+        stats['max_created_on'] = max_created_on
+
+
+def _next_chunk_rows(stats, mo_par_ligne, chunk_rows, memory_limit_mb):
+    """Taille du prochain bloc compatible avec le budget mémoire restant"""
+    # Les blocs compactés sont dupliqués une fois lors de la concaténation finale
+    restant = memory_limit_mb - 2 * stats['apres_mo']
+    taille = min(chunk_rows, int(restant / mo_par_ligne)) if mo_par_ligne > 0 else chunk_rows
+    if taille < MIN_CHUNK_ROWS:
+        raise MemoryError(
+            f"Plafond mémoire de {memory_limit_mb:.1f} Mo atteint après {stats['lignes']:,} lignes "
+            f"({stats['apres_mo']:.1f} Mo compactés)"
+        )
+    return taille
@@ -0,0 +1,241 @@
+"""Chargement incrémental des données de présence depuis une source (base ou fichiers d'export)"""
+import hashlib
+import threading
+from collections import namedtuple
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+from presence.cube import SKETCH_COLUMNS, build_cube, merge_cubes
+from presence.ingestion import DEFAULT_CHUNK_ROWS, ingest
+from presence.schema import memory_usage_mb
+from presence.sketch import DailySketches
+from presence.snapshot import load_snapshot, save_snapshot
+from presence.sources import TABLES_DIMENSIONS, as_source
+from presence.star import build_dimensions, concat_tables, recode_facts
+from presence.streaks import StreakState
+
+# Version publiée du jeu de données : remplacée d'un bloc, jamais modifiée
+Dataset = namedtuple('Dataset', ['df', 'cube', 'version', 'watermark', 'memory_report', 'streaks', 'sketches'])
+
+
+class IncrementalLoader:
+    """Maintient le jeu de données enrichi et le complète par deltas successifs
+
+    La table de suivi ne fait que croître (``id`` monotone) : seules les lignes
+    au-delà du dernier ``id`` vu sont lues puis fusionnées au jeu existant. Les
+    dimensions ne sont relues que si leur signature change : les faits déjà chargés
+    sont alors recodés en mémoire, puis seul le delta est lu. Un rechargement
+    complet n'a lieu qu'au premier chargement, ou si des faits rattachés à un point
+    de vente inconnu doivent être recodés (leur identifiant n'est pas conservé).
+    Le jeu est tenu au format étoile (``StarTable``) : faits étroits et dimensions.
+
+    Si ``snapshot_path`` est fourni, le jeu enrichi est persisté dans un instantané
+    Arrow IPC après chaque changement ; au démarrage l'instantané est relu et la
+    base n'est interrogée que pour rattraper les nouvelles lignes.
+
+    La base ou les fichiers d'export sont lus au travers d'une source
+    (``presence.sources``) passée à ``refresh``.
+
+    Le cube de présence pré-agrégé (``cube``) est tenu à jour avec le jeu enrichi :
+    reconstruit quand les faits sont (re)codés, complété par le cube du delta sinon.
+    Il en va de même de l'état des ruptures (``streaks``, ``StreakState``) et
+    des esquisses des comptes distincts (``sketches``, ``DailySketches``).
+
+    Les observations sont lues en flux par blocs de ``chunk_rows`` lignes ;
+    ``memory_limit_mb`` plafonne la mémoire d'un rafraîchissement, version résidente
+    comprise (voir ``ingest``).
+
+    Les lecteurs utilisent ``current`` (``Dataset``), publié en une seule
+    affectation à la fin de chaque rafraîchissement : un lecteur ne voit jamais
+    un jeu et un cube de versions différentes.
+
+    Si ``metrics`` (``MetricsRecorder``) est fourni, chaque sous-étape d'un
+    rafraîchissement y est mesurée (préfixe ``chargement.``).
+    """
+
+    def __init__(self, snapshot_path=None, chunk_rows=DEFAULT_CHUNK_ROWS, memory_limit_mb=None, metrics=None):
+        self.snapshot_path = snapshot_path
+        self.metrics = metrics
+        self.chunk_rows = chunk_rows
+        self.memory_limit_mb = memory_limit_mb
+        self.df = None
+        self.cube = None
+        self.streaks = None
+        self.sketches = None
+        self.signatures = {}
+        self.watermark = {'id': None, 'created_on': None}
+        self.memory_report = {}
+        self.current = None
+        self._lock = threading.Lock()
+
+    def restore(self):
+        """Publie le contenu de l'instantané local, sans interroger la base"""
+        with self._lock:
+            if self.df is None and self.snapshot_path:
+                self._restore_snapshot()
+                self._publish()
+            return self.current
+
+    def refresh(self, source):
+        """Met à jour le jeu de données depuis ``source`` et le retourne
+
+        ``source`` est une source de ``presence.sources`` (``SQLSource``,
+        ``FileSource``) ou un moteur SQLAlchemy.
+        """
+        source = as_source(source)
+        with self._lock:
+            if self.df is None and self.snapshot_path:
+                self._restore_snapshot()
+
+            version = self.data_version
+            with self._stage('chargement.signatures'):
+                signatures = source.signatures()
+
+            if self.watermark['id'] is None:
+                self._full_reload(source, signatures)
+            elif signatures != self.signatures and not self._reload_dimensions(source, signatures):
+                self._full_reload(source, signatures)
+            else:
+                self._load_delta(source)
+
+            if self.data_version != version or self.current is None:
+                self._publish()
+                if self.snapshot_path:
+                    with self._stage('chargement.instantane'):
+                        save_snapshot(self.df, self.snapshot_path, self.watermark, self.signatures)
+
+            if self.metrics is not None:
+                self.metrics.flush()
+            return self.df
+
+    def _stage(self, name):
+        """Mesure une sous-étape si un enregistreur de métriques est configuré"""
+        return self.metrics.stage(name) if self.metrics is not None else nullcontext()
+
+    def _publish(self):
+        """Remplace atomiquement la version publiée"""
+        if self.df is not None:
+            self.current = Dataset(self.df, self.cube, self.data_version, dict(self.watermark), dict(self.memory_report), self.streaks, self.sketches)
+
+    @property
+    def data_version(self):
+        """Tampon de version des données : dernier id vu + signatures des dimensions"""
+        if self.watermark['id'] is None:
+            return None
+        empreinte = hashlib.md5(repr(sorted(self.signatures.items())).encode()).hexdigest()[:8]
+        return f"{self.watermark['id']}-{empreinte}"
+
+    def _restore_snapshot(self):
+        """Reprend le jeu enrichi et son filigrane depuis l'instantané local"""
+        with self._stage('chargement.restauration'):
+            snapshot = load_snapshot(self.snapshot_path)
+            if snapshot is not None:
+                self.df, self.watermark, self.signatures = snapshot
+                self.cube = build_cube(self.df)
+                self.streaks = StreakState.from_table(self.df)
+                self.sketches = DailySketches.from_cube(self.cube, SKETCH_COLUMNS)
+
+    def _full_reload(self, source, signatures):
+        """Recharge toutes les tables et recode les faits
+
+        Les dimensions sont lues en parallèle pendant que le flux des observations démarre.
+        """
+        with ThreadPoolExecutor(max_workers=len(TABLES_DIMENSIONS)) as executor:
+            futures = {name: executor.submit(source.read_dimension, name) for name in TABLES_DIMENSIONS}
+
+            def dimensions():
+                return build_dimensions(futures['produits'].result(), futures['points_de_vente'].result())
+
+            with self._stage('chargement.complet'):
+                df, stats = ingest(
+                    source.read_tracking(), dimensions,
+                    chunk_rows=self.chunk_rows, memory_limit_mb=self._budget()
+                )
+
+        self.signatures = signatures
+        self.watermark = {'id': None, 'created_on': None}
+        self.memory_report = {'avant_mo': stats['avant_mo'], 'apres_mo': stats['apres_mo']}
+        self.df = df
+        with self._stage('chargement.cube'):
+            self.cube = build_cube(self.df)
+        with self._stage('chargement.ruptures'):
+            self.streaks = StreakState.from_table(self.df)
+        with self._stage('chargement.esquisses'):
+            self.sketches = DailySketches.from_cube(self.cube, SKETCH_COLUMNS)
+        self._advance_watermark(stats)
+
+    def _budget(self, copies=0):
+        """Budget mémoire d'une lecture : plafond moins la version résidente
+
+        Le jeu et le cube publiés restent servis pendant le rafraîchissement et
+        ne sont libérés qu'après publication de la nouvelle version ; ``copies``
+        compte en plus les duplications du jeu existant (concaténation du delta).
+        """
+        if self.memory_limit_mb is None:
+            return None
+        if self.df is None:
+            return self.memory_limit_mb
+        resident = (1 + copies) * memory_usage_mb(self.df) + memory_usage_mb(self.cube)
+        return self.memory_limit_mb - resident
+
+    def _reload_dimensions(self, source, signatures):
+        """Relit les dimensions et recode les faits existants en mémoire
+
+        Retourne ``False`` (rien n'est modifié) si des faits rattachés à un point de
+        vente inconnu empêchent le recodage : un rechargement complet est alors requis.
+        """
+        inconnu = len(self.df.dimensions.points_de_vente) - 1
+        if (self.df.facts['store_key'].to_numpy() == inconnu).any():
+            return False
+
+        with self._stage('chargement.dimensions'):
+            with ThreadPoolExecutor(max_workers=len(TABLES_DIMENSIONS)) as executor:
+                produits, points_de_vente = executor.map(source.read_dimension, TABLES_DIMENSIONS)
+            dimensions = build_dimensions(produits, points_de_vente)
+
+        # Les attributs des faits existants (marque, zone, date) ont pu changer
+        with self._stage('chargement.recodage'):
+            self.df = recode_facts(self.df, dimensions)
+        self.signatures = signatures
+        with self._stage('chargement.cube'):
+            self.cube = build_cube(self.df)
+        with self._stage('chargement.ruptures'):
+            self.streaks = StreakState.from_table(self.df)
+        with self._stage('chargement.esquisses'):
+            self.sketches = DailySketches.from_cube(self.cube, SKETCH_COLUMNS)
+        return True
+
+    def _load_delta(self, source):
+        """Lit uniquement les observations postérieures au dernier id connu
+
+        Les nouveaux faits sont codés avec les dimensions du jeu existant (reprises
+        d'un instantané ou relues par ``_reload_dimensions``).
+        """
+        with self._stage('chargement.delta'):
+            enrichi, stats = ingest(
+                source.read_tracking(after_id=self.watermark['id']),
+                lambda: self.df.dimensions,
+                chunk_rows=self.chunk_rows,
+                memory_limit_mb=self._budget(copies=1)
+            )
+        if stats['lignes'] == 0:
+            return
+
+        with self._stage('chargement.fusion_delta'):
+            self.df = concat_tables([self.df, enrichi])
+            cube_delta = build_cube(enrichi)
+            self.cube = merge_cubes(self.cube, cube_delta)
+        with self._stage('chargement.ruptures'):
+            self.streaks = self.streaks.update(enrichi)
+        with self._stage('chargement.esquisses'):
+            self.sketches = self.sketches.update(cube_delta)
+        self._advance_watermark(stats)
+
+    def _advance_watermark(self, stats):
+        """Avance le filigrane (dernier id et dernière date de création vus)"""
+        if stats['max_id'] is None:
+            return
+        created_on = stats['max_created_on']
+        if self.watermark['created_on'] is not None:
+            created_on = max(created_on, self.watermark['created_on'])
+        self.watermark = {'id': stats['max_id'], 'created_on': created_on}
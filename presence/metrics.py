@@ -0,0 +1,163 @@
+"""Instrumentation des étapes (durée, mémoire) et puits de métriques local"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+PERCENTILES = (50, 90, 99)
+DEFAULT_WINDOW = 1_000
+DEFAULT_SINK_MAX_MB = 20  # taille d'un fichier .jsonl avant rotation
+SINK_BACKUPS = 2  # fichiers tournés gardés (metrics.jsonl.1, metrics.jsonl.2)
+
+
+def rss_mb():
+    """Mémoire résidente du processus (Mo), ou None hors Linux"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class MetricsRecorder:
+    """Mesure les étapes et agrège leurs durées pour toutes les sessions du processus
+
+    ``stage`` (gestionnaire de contexte) et ``timed`` (décorateur) enregistrent la
+    durée et la variation de mémoire résidente de chaque étape. Les mesures sont :
+
+    - gardées pour l'exécution en cours du thread appelant (``run_timings``),
+      Streamlit exécutant chaque rerun d'une session dans son propre thread ;
+    - conservées sur une fenêtre glissante de ``window`` mesures par étape,
+      pour les centiles inter-sessions (``percentiles``) ;
+    - écrites dans ``sink_path`` : une ligne JSON par mesure (``.jsonl``) ou,
+      pour un fichier ``.prom``, un résumé au format texte Prometheus réécrit à
+      chaque ``flush`` (collecteur textfile de node_exporter).
+
+    Un puits ``.jsonl`` tourne dès qu'il dépasse ``max_mb`` Mo : il devient
+    ``<fichier>.1`` et seuls ``SINK_BACKUPS`` fichiers tournés sont gardés, ce
+    qui borne l'espace disque d'un serveur de longue durée.
+    """
+
+    def __init__(self, sink_path=None, window=DEFAULT_WINDOW, max_mb=DEFAULT_SINK_MAX_MB):
+        self.sink_path = sink_path
+        self.max_bytes = int(max_mb * 1024 ** 2)
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._totals = defaultdict(lambda: [0, 0.0])  # nombre, somme des durées (compteurs Prometheus)
+        self._pending = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sink_lock = threading.Lock()
+        if sink_path and os.path.dirname(sink_path):
+            os.makedirs(os.path.dirname(sink_path), exist_ok=True)
+
+    @contextmanager
+    def stage(self, name):
+        """Mesure le bloc ``with`` sous le nom d'étape ``name``"""
+        rss_avant = rss_mb()
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            duree = time.perf_counter() - debut
+            rss_apres = rss_mb()
+            self._record(name, duree, rss_apres, None if rss_avant is None else rss_apres - rss_avant)
+
+    def timed(self, name=None):
+        """Décorateur mesurant chaque appel de la fonction"""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(name or fn.__name__):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _record(self, name, duree, rss, delta):
+        mesure = {
+            'horodatage': datetime.now().isoformat(timespec='milliseconds'),
+            'etape': name,
+            'duree_s': round(duree, 6),
+            'rss_mo': None if rss is None else round(rss, 1),
+            'delta_mo': None if delta is None else round(delta, 1),
+            'thread': threading.current_thread().name
+        }
+        run = getattr(self._local, 'run', None)
+        if run is not None:
+            run.append(mesure)
+        with self._lock:
+            self._samples[name].append(duree)
+            self._totals[name][0] += 1
+            self._totals[name][1] += duree
+            self._pending.append(mesure)
+
+    def start_run(self):
+        """Démarre la collecte des mesures d'une exécution (rerun) dans ce thread"""
+        self._local.run = []
+
+    def run_timings(self):
+        """Mesures de l'exécution en cours du thread appelant"""
+        return pd.DataFrame(getattr(self._local, 'run', None) or [], columns=['etape', 'duree_s', 'delta_mo', 'rss_mo'])
+
+    def percentiles(self, percentiles=PERCENTILES):
+        """Centiles des durées (s) par étape sur la fenêtre glissante, toutes sessions confondues"""
+        with self._lock:
+            samples = {name: np.fromiter(values, float) for name, values in self._samples.items() if values}
+        lignes = [
+            {'etape': name, 'n': len(values), **{f"p{p}": float(np.percentile(values, p)) for p in percentiles}}
+            for name, values in sorted(samples.items())
+        ]
+        return pd.DataFrame(lignes, columns=['etape', 'n'] + [f"p{p}" for p in percentiles])
+
+    def flush(self):
+        """Écrit les mesures en attente dans le puits (sans effet si aucun n'est configuré)"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not self.sink_path:
+            return
+        if self.sink_path.endswith('.prom'):
+            self._write_prometheus()
+        elif pending:
+            with self._sink_lock:
+                self._rotate()
+                with open(self.sink_path, 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(mesure) + "\n" for mesure in pending)
+
+    def _rotate(self):
+        """Décale ``sink_path`` → ``.1`` → ``.2``… s'il dépasse ``max_bytes`` (appelé sous verrou)"""
+        try:
+            if os.path.getsize(self.sink_path) < self.max_bytes:
+                return
+        except OSError:  # puits pas encore créé
+            return
+        for i in range(SINK_BACKUPS - 1, 0, -1):
+            if os.path.exists(f"{self.sink_path}.{i}"):
+                os.replace(f"{self.sink_path}.{i}", f"{self.sink_path}.{i + 1}")
+        os.replace(self.sink_path, f"{self.sink_path}.1")
+
+    def _write_prometheus(self):
+        quantiles = self.percentiles()
+        with self._lock:
+            totals = {name: tuple(total) for name, total in self._totals.items()}
+        lignes = [
+            "# HELP presence_stage_duration_seconds Durée des étapes du dashboard",
+            "# TYPE presence_stage_duration_seconds summary"
+        ]
+        for row in quantiles.itertuples(index=False):
+            for p in PERCENTILES:
+                lignes.append(f'presence_stage_duration_seconds{{stage="{row.etape}",quantile="{p / 100}"}} {getattr(row, f"p{p}"):.6f}')
+            count, total = totals[row.etape]
+            lignes.append(f'presence_stage_duration_seconds_count{{stage="{row.etape}"}} {count}')
+            lignes.append(f'presence_stage_duration_seconds_sum{{stage="{row.etape}"}} {total:.6f}')
+
+        # Écriture atomique : le collecteur ne lit jamais un fichier partiel
+        tmp_path = f"{self.sink_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lignes) + "\n")
+        os.replace(tmp_path, self.sink_path)
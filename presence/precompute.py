@@ -0,0 +1,73 @@
+"""Agrégats matérialisés sur disque par version des données et sélection de filtres"""
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from presence.engine import KPI_DISTINCT, ROLLUPS, Filters, aggregate
+
+PRECOMPUTED_DIR = os.path.join(".cache", "aggregats")
+MANIFEST = "manifest.json"
+
+
+def selection_dir(root, version, filters):
+    """Répertoire des agrégats d'une version et d'une sélection de filtres"""
+    empreinte = hashlib.md5(repr(Filters(*filters).key()).encode()).hexdigest()[:12]
+    return os.path.join(root, str(version), empreinte)
+
+
+def has_aggregates(root, version, filters):
+    """Indique si les agrégats d'une version et d'une sélection ont été matérialisés"""
+    return os.path.exists(os.path.join(selection_dir(root, version, filters), MANIFEST))
+
+
+def write_aggregates(selection, root, version, filters):
+    """Matérialise tous les agrégats de ``ROLLUPS`` et le résumé des KPIs d'une sélection"""
+    directory = selection_dir(root, version, filters)
+    os.makedirs(directory, exist_ok=True)
+    for name in ROLLUPS:
+        aggregate(selection, name).to_parquet(os.path.join(directory, f"{name}.parquet"))
+
+    # Le manifeste est écrit en dernier : sa présence signale un jeu complet
+    manifest = {
+        'version': version,
+        'filtres': [str(value) if value is not None else None for value in Filters(*filters).key()],
+        'resume': {key: int(value) for key, value in selection.summarize(KPI_DISTINCT).items()}
+    }
+    with open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return directory
+
+
+class PrecomputedSelection:
+    """Sélection servie depuis des agrégats précalculés
+
+    Même interface que ``CubeSelection`` : les remontées prévues par ``ROLLUPS``
+    et le résumé des KPIs sont lus sur disque (une fois), toute autre demande est
+    déléguée à la sélection ``fallback``.
+    """
+
+    def __init__(self, directory, fallback):
+        self.directory = directory
+        self.fallback = fallback
+        with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self._frames = {}
+
+    def rollup(self, keys, distinct=None):
+        """Agrégat précalculé correspondant à ``(keys, distinct)``, sinon calcul délégué"""
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        for name, (rollup_keys, rollup_distinct) in ROLLUPS.items():
+            if rollup_keys == keys and rollup_distinct == (distinct or {}):
+                if name not in self._frames:
+                    self._frames[name] = pd.read_parquet(os.path.join(self.directory, f"{name}.parquet"))
+                return self._frames[name]
+        return self.fallback.rollup(keys, distinct)
+
+    def summarize(self, distinct=None, approximate=False):
+        """Résumé précalculé (exact) si les comptes distincts demandés y figurent"""
+        resume = self.manifest['resume']
+        if set(distinct or {}) <= set(resume) and all(KPI_DISTINCT.get(name) == col for name, col in (distinct or {}).items()):
+            return {key: resume[key] for key in ['observations', 'presences', *(distinct or {})]}
+        return self.fallback.summarize(distinct, approximate=approximate)
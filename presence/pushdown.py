@@ -0,0 +1,223 @@
+"""Mode agrégation en base : filtres et GROUP BY exécutés par le SGBD
+
+Seules les lignes agrégées remontent dans le processus du dashboard. Le SQL
+généré fonctionne sur PostgreSQL et sur SQLite (substitut local avec le même
+schéma que ``untitled.csv``).
+"""
+import pandas as pd
+import pyarrow as pa
+from sqlalchemy import bindparam, text
+
+from presence.explorer import SEARCH_COLUMNS
+
+FROM_CLAUSE = """
+FROM tracking_presence t
+LEFT JOIN produits p ON p.id = t.product_id
+LEFT JOIN points_de_vente v ON CAST(v.nom AS TEXT) = CAST(t.id_point_de_vente AS TEXT)
+"""
+
+PRESENCES_SQL = "SUM(CASE WHEN t.value THEN 1 ELSE 0 END)"
+
+
+def _date_expressions(dialect):
+    """Expressions SQL de date_reference et de son jour selon le dialecte"""
+    if dialect == 'postgresql':
+        date_reference = "COALESCE(CAST(v.date_ouverture AS TIMESTAMP), CAST(t.created_on AS TIMESTAMP))"
+        return date_reference, f"CAST({date_reference} AS DATE)"
+    # SQLite : les dates sont stockées en texte ISO
+    date_reference = "COALESCE(v.date_ouverture, t.created_on)"
+    return date_reference, f"DATE({date_reference})"
+
+
+def column_expressions(dialect):
+    """Correspondance colonne du jeu enrichi → expression SQL"""
+    date_reference, jour = _date_expressions(dialect)
+    return {
+        'date': jour,
+        'date_reference': date_reference,
+        'marque': 'p.marque',
+        'segment': 't.segment',
+        'zone': 'v.zone',
+        'product_id': 't.product_id',
+        'nom_produit': 'p.nom',
+        'nom_point_vente': 'v.nom',
+        'latitude': 'v.latitude',
+        'longitude': 'v.longitude'
+    }
+
+
+# Types des colonnes exportées : chaque bloc lu en base est converti vers ces types,
+# quelles que soient les valeurs du bloc (colonne entièrement vide, entiers puis décimaux)
+COLUMN_DTYPES = {
+    'value': 'boolean',
+    'date': 'datetime64[us]',
+    'date_reference': 'datetime64[us]',
+    'marque': 'string',
+    'segment': 'string',
+    'zone': 'string',
+    'product_id': 'Int64',
+    'nom_produit': 'string',
+    'nom_point_vente': 'string',
+    'latitude': 'float64',
+    'longitude': 'float64'
+}
+
+
+def filter_options(engine):
+    """Bornes de dates et modalités proposées dans la sidebar"""
+    colonnes = column_expressions(engine.dialect.name)
+    bornes = pd.read_sql(f"SELECT MIN({colonnes['date']}) AS date_min, MAX({colonnes['date']}) AS date_max {FROM_CLAUSE}", engine)
+    options = {
+        'date_min': pd.Timestamp(bornes['date_min'].iloc[0]),
+        'date_max': pd.Timestamp(bornes['date_max'].iloc[0])
+    }
+    for col, query in (
+        ('marque', "SELECT DISTINCT marque AS valeur FROM produits WHERE marque IS NOT NULL"),
+        ('segment', "SELECT DISTINCT segment AS valeur FROM tracking_presence WHERE segment IS NOT NULL"),
+        ('zone', "SELECT DISTINCT zone AS valeur FROM points_de_vente WHERE zone IS NOT NULL")
+    ):
+        options[col] = sorted(pd.read_sql(query, engine)['valeur'])
+    return options
+
+
+def data_version(engine):
+    """Tampon de version des données en base : dernier id et nombre de lignes du suivi"""
+    row = pd.read_sql("SELECT MAX(id) AS max_id, COUNT(*) AS n FROM tracking_presence", engine).iloc[0]
+    return f"base-{row['max_id']}-{row['n']}"
+
+
+class PushdownSelection:
+    """Sélection de filtres évaluée en base par des requêtes paramétrées"""
+
+    def __init__(self, engine, date_range=None, marques=None, segments=None, zones=None):
+        self.engine = engine
+        self.colonnes = column_expressions(engine.dialect.name)
+
+        conditions = []
+        self.params = {}
+        expanding = []
+        if date_range is not None and len(date_range) == 2:
+            conditions.append(f"{self.colonnes['date']} BETWEEN :debut AND :fin")
+            self.params['debut'] = pd.Timestamp(date_range[0]).date().isoformat()
+            self.params['fin'] = pd.Timestamp(date_range[1]).date().isoformat()
+        for col, selection in (('marque', marques), ('segment', segments), ('zone', zones)):
+            if selection:
+                conditions.append(f"{self.colonnes[col]} IN :{col}")
+                self.params[col] = list(selection)
+                expanding.append(col)
+        self.conditions = conditions
+        self.expanding = expanding
+
+    def _read(self, sql, params=None):
+        """Exécute une requête paramétrée et retourne un DataFrame"""
+        query = text(sql).bindparams(*[bindparam(name, expanding=True) for name in self.expanding])
+        return pd.read_sql(query, self.engine, params={**self.params, **(params or {})})
+
+    def _where(self, extra=()):
+        conditions = list(self.conditions) + list(extra)
+        return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    def rollup(self, keys, distinct=None):
+        """GROUP BY en base ; même résultat que ``CubeSelection.rollup``"""
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        distinct = distinct or {}
+
+        select = [f'{self.colonnes[key]} AS "{key}"' for key in keys]
+        select += ['COUNT(*) AS "Observations"', f'{PRESENCES_SQL} AS "Presences"']
+        select += [f'COUNT(DISTINCT {self.colonnes[col]}) AS "{name}"' for name, col in distinct.items()]
+        # Comme pandas, les groupes à clé manquante sont écartés
+        non_nulls = [f"{self.colonnes[key]} IS NOT NULL" for key in keys]
+        group_by = ', '.join(self.colonnes[key] for key in keys)
+
+        stats = self._read(
+            f"SELECT {', '.join(select)} {FROM_CLAUSE} {self._where(non_nulls)} "
+            f"GROUP BY {group_by} ORDER BY {group_by}"
+        )
+        if 'date' in keys:
+            stats['date'] = pd.to_datetime(stats['date'])
+
+        stats = stats.set_index(keys)
+        stats['Presences'] = stats['Presences'].astype('int64')
+        stats.insert(2, 'Taux_Presence', (stats['Presences'] / stats['Observations']).round(3))
+        return stats
+
+    def summarize(self, distinct=None, approximate=False):
+        """Totaux d'observations et de présences, et comptes distincts demandés
+
+        Les comptes restent exacts même si ``approximate`` : PostgreSQL n'a pas
+        d'HyperLogLog sans extension.
+        """
+        distinct = distinct or {}
+        select = ['COUNT(*) AS observations', f'{PRESENCES_SQL} AS presences']
+        select += [f'COUNT(DISTINCT {self.colonnes[col]}) AS "{name}"' for name, col in distinct.items()]
+        row = self._read(f"SELECT {', '.join(select)} {FROM_CLAUSE} {self._where()}").iloc[0]
+        return {name: int(row[name]) if pd.notna(row[name]) else 0 for name in row.index}
+
+    def date_coverage(self):
+        """Part des observations datées par l'ouverture du point de vente, et étendue temporelle"""
+        row = self._read(
+            f"SELECT COUNT(*) AS total, COUNT(v.date_ouverture) AS avec_date_ouverture, "
+            f"MIN({self.colonnes['date_reference']}) AS date_min, MAX({self.colonnes['date_reference']}) AS date_max "
+            f"{FROM_CLAUSE} {self._where()}"
+        ).iloc[0]
+        return {
+            'total': int(row['total']),
+            'avec_date_ouverture': int(row['avec_date_ouverture']),
+            'date_min': pd.Timestamp(row['date_min']),
+            'date_max': pd.Timestamp(row['date_max'])
+        }
+
+    @property
+    def columns(self):
+        """Colonnes proposées par l'explorateur paginé"""
+        return ['value'] + list(self.colonnes)
+
+    def _select(self, columns=None):
+        expressions = {'value': 't.value', **self.colonnes}
+        return ', '.join(f'{expressions[col]} AS "{col}"' for col in (columns or self.columns))
+
+    def page(self, page, page_size, sort_by=None, ascending=True, search='', columns=None):
+        """Page d'observations triée et filtrée en base ; retourne ``(lignes, total)``"""
+        conditions = []
+        params = {}
+        search = (search or '').strip().lower()
+        if search:
+            conditions.append('(' + ' OR '.join(
+                f"LOWER(CAST({self.colonnes[col]} AS TEXT)) LIKE :recherche" for col in SEARCH_COLUMNS
+            ) + ')')
+            params['recherche'] = f"%{search}%"
+
+        expressions = {'value': 't.value', **self.colonnes}
+        select = self._select(columns)
+        order_by = f"ORDER BY {expressions[sort_by]} {'ASC' if ascending else 'DESC'} NULLS LAST" if sort_by else ""
+
+        total = int(self._read(f"SELECT COUNT(*) AS n {FROM_CLAUSE} {self._where(conditions)}", params).iloc[0]['n'])
+        lignes = self._read(
+            f"SELECT {select} {FROM_CLAUSE} {self._where(conditions)} {order_by} "
+            f"LIMIT {int(page_size)} OFFSET {int(page) * int(page_size)}",
+            params
+        )
+        return lignes, total
+
+    def arrow_schema(self, columns=None):
+        """Schéma Arrow des blocs de ``iter_chunks``, connu avant toute lecture"""
+        vide = pd.DataFrame(columns=columns or self.columns).astype(COLUMN_DTYPES)
+        return pa.Schema.from_pandas(vide, preserve_index=False)
+
+    def iter_chunks(self, chunk_rows, columns=None):
+        """Parcourt les observations filtrées par blocs via un curseur côté serveur
+
+        Chaque bloc est converti vers ``COLUMN_DTYPES`` : ses types ne dépendent pas
+        des valeurs lues.
+        """
+        query = text(f"SELECT {self._select(columns)} {FROM_CLAUSE} {self._where()}").bindparams(
+            *[bindparam(name, expanding=True) for name in self.expanding]
+        )
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(query, self.params)
+            colonnes = list(result.keys())
+            while True:
+                rows = result.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                yield pd.DataFrame.from_records(rows, columns=colonnes).astype(COLUMN_DTYPES)
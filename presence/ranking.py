@@ -0,0 +1,49 @@
+"""Classements partiels (top K / bottom K) sans tri complet des agrégats"""
+import numpy as np
+
+TIES = ('first', 'all')
+
+
+def _best_positions(values, k, ties):
+    """Positions des ``k`` plus grandes valeurs, triées (décroissant, puis ordre d'origine)
+
+    ``np.partition`` donne la k-ième valeur en O(n) ; seules les lignes au-dessus
+    de ce seuil (et les ex æquo retenus) sont ensuite triées.
+    """
+    n = len(values)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k >= n:
+        return np.argsort(-values, kind='stable')
+
+    seuil = np.partition(values, n - k)[n - k]
+    meilleures = np.flatnonzero(values > seuil)
+    ex_aequo = np.flatnonzero(values == seuil)
+    if ties == 'first':
+        ex_aequo = ex_aequo[:k - len(meilleures)]
+    positions = np.sort(np.concatenate([meilleures, ex_aequo]))
+    return positions[np.argsort(-values[positions], kind='stable')]
+
+
+def top_k(df, column, k, ascending=False, ties='first'):
+    """Les ``k`` lignes de ``df`` les mieux classées sur ``column``
+
+    - ``ascending=False`` : plus grandes valeurs d'abord (top K) ; ``True`` :
+      plus petites d'abord (bottom K) ;
+    - ``ties='first'`` : exactement ``k`` lignes, les ex æquo départagés par
+      l'ordre d'origine (comme un tri stable suivi de ``head``) ; ``'all'`` :
+      tous les ex æquo de la k-ième valeur sont gardés.
+
+    Les valeurs manquantes sont classées en dernier.
+    """
+    if ties not in TIES:
+        raise ValueError(f"ties doit valoir {' ou '.join(TIES)} : {ties!r}")
+    values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+    values = -values if ascending else values.copy()
+    values[np.isnan(values)] = -np.inf
+    return df.iloc[_best_positions(values, k, ties)]
+
+
+def bottom_k(df, column, k, ties='first'):
+    """Les ``k`` lignes de plus faible ``column``, la plus faible d'abord"""
+    return top_k(df, column, k, ascending=True, ties=ties)
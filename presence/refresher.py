@@ -0,0 +1,91 @@
+"""Rafraîchissement des données en tâche de fond (stale-while-revalidate)"""
+import threading
+import time
+from datetime import datetime
+
+READY_TIMEOUT_S = 300  # attente maximale de la première version par une session
+
+
+class BackgroundRefresher:
+    """Recharge les données périodiquement dans un thread dédié
+
+    Les sessions lisent toujours la dernière version publiée par le chargeur ;
+    aucune requête interactive n'attend la base, sauf au tout premier démarrage
+    sans instantané. ``trigger`` demande un rafraîchissement immédiat (bouton de
+    l'interface, signal de changement).
+
+    ``status`` est écrit par le thread de rafraîchissement et lu par les
+    sessions : chaque lecture retourne une copie prise sous verrou, jamais un
+    état à moitié mis à jour.
+    """
+
+    def __init__(self, loader, source_factory, interval=600):
+        self.loader = loader
+        self.source_factory = source_factory
+        self.interval = interval
+        self._status = {
+            'etat': 'en attente',
+            'derniere_tentative': None,
+            'dernier_succes': None,
+            'duree_s': None,
+            'erreur': None
+        }
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+
+    @property
+    def status(self):
+        """Copie cohérente de l'état du dernier rafraîchissement"""
+        with self._lock:
+            return dict(self._status)
+
+    def _set_status(self, **changes):
+        with self._lock:
+            self._status.update(changes)
+
+    def start(self):
+        """Démarre le thread de rafraîchissement (une seule fois)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="presence-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def trigger(self):
+        """Demande un rafraîchissement sans attendre la prochaine échéance"""
+        self._wake.set()
+
+    def wait_ready(self, timeout=READY_TIMEOUT_S):
+        """Attend qu'une première version des données soit publiée (ou un premier échec)
+
+        Retourne ``False`` si rien n'est publié après ``timeout`` secondes
+        (``None`` : attente sans limite).
+        """
+        return self._ready.wait(timeout)
+
+    def _run(self):
+        # L'instantané local est publié immédiatement, avant tout accès à la base
+        try:
+            if self.loader.restore() is not None:
+                self._ready.set()
+        except Exception as e:
+            self._set_status(erreur=f"Instantané illisible : {e}")
+
+        while True:
+            self.refresh_once()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def refresh_once(self):
+        """Exécute un rafraîchissement ; en cas d'échec la version précédente reste servie"""
+        debut = time.perf_counter()
+        self._set_status(etat='rafraîchissement en cours', derniere_tentative=datetime.now())
+        try:
+            self.loader.refresh(self.source_factory())
+        except Exception as e:
+            self._set_status(etat='erreur', erreur=str(e), duree_s=time.perf_counter() - debut)
+        else:
+            self._set_status(etat='à jour', erreur=None, dernier_succes=datetime.now(), duree_s=time.perf_counter() - debut)
+        finally:
+            self._ready.set()
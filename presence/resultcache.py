@@ -0,0 +1,145 @@
+"""Cache LRU des agrégats et des figures, partagé par toutes les sessions du processus"""
+import hashlib
+import json
+import sys
+import threading
+
+import pandas as pd
+import plotly.io as pio
+from cachetools import LRUCache
+
+from presence.filters import FilterIndex
+
+DEFAULT_MAX_MB = 256
+
+
+def cache_key(name, filters, version):
+    """Empreinte canonique de (nom, filtres, version des données)
+
+    Les filtres passent par ``FilterIndex.key`` : l'ordre des listes et le type
+    des dates (``date`` ou ``Timestamp``) ne changent pas l'empreinte.
+    """
+    periode, marques, segments, zones = FilterIndex.key(*filters)
+    canonique = json.dumps([
+        name,
+        version,
+        [d.isoformat() for d in periode] if periode is not None else None,
+        marques,
+        segments,
+        zones
+    ], default=str)
+    return hashlib.sha1(canonique.encode()).hexdigest()
+
+
+def _sizeof(value):
+    """Taille approximative (octets) d'une entrée : JSON, DataFrame ou tuple de ceux-ci"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (tuple, list)):
+        return sum(_sizeof(v) for v in value)
+    if isinstance(value, str):
+        return len(value)
+    return sys.getsizeof(value)
+
+
+def _shallow_copy(value):
+    """Copie superficielle des DataFrames partagés (Copy-on-Write : une écriture ne touche pas le cache)"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    if isinstance(value, tuple):
+        return tuple(_shallow_copy(v) for v in value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+class _CountingLRU(LRUCache):
+    """LRU de cachetools comptant les évictions"""
+
+    def __init__(self, maxsize, getsizeof=None):
+        super().__init__(maxsize, getsizeof)
+        self.evictions = 0
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+
+class ResultCache:
+    """Agrégats et figures sérialisées, bornés à ``max_mb`` Mo, clés (nom, filtres, version)
+
+    Une nouvelle version des données vide le cache : les entrées des versions
+    précédentes ne peuvent plus être servies. Les calculs sont faits hors
+    verrou ; deux sessions peuvent calculer la même entrée, la dernière gagne.
+    """
+
+    def __init__(self, max_mb=DEFAULT_MAX_MB):
+        self.max_mb = max_mb
+        self.version = None
+        self._cache = _CountingLRU(int(max_mb * 1024 ** 2), getsizeof=_sizeof)
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._lock = threading.Lock()
+
+    def _get_or_compute(self, name, filters, version, compute):
+        key = cache_key(name, filters, version)
+        with self._lock:
+            if version != self.version:
+                self._invalidate(version)
+            try:
+                value = self._cache[key]
+                self._hits += 1
+                return value
+            except KeyError:
+                self._misses += 1
+
+        value = compute()
+        with self._lock:
+            if version == self.version:
+                try:
+                    self._cache[key] = value
+                except ValueError:  # entrée plus grande que le cache entier
+                    pass
+        return value
+
+    def _invalidate(self, version):
+        """Repart d'un cache vide pour ``version`` (appelé sous verrou)"""
+        if len(self._cache):
+            self._invalidations += 1
+        self._evictions += self._cache.evictions
+        self._cache = _CountingLRU(self._cache.maxsize, getsizeof=_sizeof)
+        self.version = version
+
+    def aggregate(self, name, filters, version, compute):
+        """Agrégat (DataFrame, tuple, dict) calculé par ``compute()`` ou servi depuis le cache"""
+        return _shallow_copy(self._get_or_compute(name, filters, version, compute))
+
+    def figure(self, name, filters, version, build):
+        """Figure Plotly construite par ``build()`` (ou None), gardée sérialisée en JSON"""
+        def serialize():
+            fig = build()
+            return None if fig is None else pio.to_json(fig, validate=False)
+
+        serialisee = self._get_or_compute(name, filters, version, serialize)
+        return None if serialisee is None else pio.from_json(serialisee, skip_invalid=True)
+
+    def stats(self):
+        """Compteurs de succès, d'échecs, d'évictions et occupation du cache"""
+        with self._lock:
+            demandes = self._hits + self._misses
+            return {
+                'succes': self._hits,
+                'echecs': self._misses,
+                'taux_succes': round(100 * self._hits / demandes, 1) if demandes else None,
+                'evictions': self._evictions + self._cache.evictions,
+                'invalidations': self._invalidations,
+                'entrees': len(self._cache),
+                'taille_mo': round(self._cache.currsize / 1024 ** 2, 2),
+                'max_mo': self.max_mb,
+                'version': self.version
+            }
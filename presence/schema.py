@@ -0,0 +1,72 @@
+"""Schéma du jeu de données : colonnes projetées et types compacts"""
+import pandas as pd
+
+# Colonnes lues en base (projection au lieu de SELECT *)
+TRACKING_COLUMNS = ['id', 'visit_id', 'product_id', 'value', 'created_on', 'id_point_de_vente', 'segment']
+PRODUITS_COLUMNS = ['id', 'nom', 'marque']
+POINTS_DE_VENTE_COLUMNS = ['nom', 'zone', 'latitude', 'longitude', 'date_ouverture']
+
+# Colonnes du jeu enrichi effectivement utilisées par les pages du dashboard
+DASHBOARD_COLUMNS = [
+    'product_id', 'value', 'created_on', 'segment',
+    'nom_produit', 'marque', 'nom_point_vente', 'zone', 'latitude', 'longitude',
+    'date_ouverture', 'date_reference', 'annee', 'mois', 'jour_semaine', 'semaine', 'date'
+]
+
+# Colonnes stockées dans la table de faits (les autres sont résolues dans les dimensions)
+FACT_COLUMNS = ['product_id', 'product_key', 'store_key', 'visit_id', 'value', 'created_on', 'segment', 'date_reference', 'day_key']
+
+# Attributs des faits à faible cardinalité stockés en catégories
+CATEGORICAL_COLUMNS = ['segment']
+
+
+def select_sql(table, columns, where=None):
+    """Construit la requête de lecture projetée d'une table"""
+    query = f"SELECT {', '.join(columns)} FROM {table}"
+    if where:
+        query += f" WHERE {where}"
+    return query
+
+
+def memory_usage_mb(df):
+    """Retourne l'empreinte mémoire réelle d'un DataFrame en Mo"""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def compact(df):
+    """Projette les colonnes de la table de faits et convertit vers des types compacts"""
+    df = df[[col for col in FACT_COLUMNS if col in df.columns]].copy()
+
+    df['value'] = df['value'].fillna(False).astype(bool)
+    df['product_id'] = pd.to_numeric(df['product_id'], downcast='integer')
+    if 'visit_id' in df.columns:
+        df['visit_id'] = pd.to_numeric(df['visit_id'], downcast='integer')
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    return df
+
+
+def concat_rows(parts):
+    """Concatène des blocs de faits compactés en unifiant les catégories
+
+    Les nouvelles modalités sont ajoutées en fin de liste : les codes du premier
+    bloc restent valides.
+    """
+    parts = [part.copy(deep=False) for part in parts]
+    for col in CATEGORICAL_COLUMNS:
+        if col in parts[0].columns:
+            categories = parts[0][col].cat.categories
+            for part in parts[1:]:
+                categories = categories.append(part[col].cat.categories.difference(categories))
+            for part in parts:
+                part[col] = part[col].cat.set_categories(categories)
+
+    return pd.concat(parts, ignore_index=True)
+
+
+def append_rows(df, delta):
+    """Concatène un delta compacté au jeu existant en unifiant les catégories"""
+    return concat_rows([df, delta])
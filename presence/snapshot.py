@@ -0,0 +1,86 @@
+"""Instantané columnaire local (Arrow IPC) du jeu de données enrichi"""
+import base64
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+from presence.star import Dimensions, StarTable
+
+# Incrémenter si le format des métadonnées ou du jeu enrichi change
+SNAPSHOT_FORMAT = 5
+METADATA_KEY = b'presence'
+
+
+def _encode_table(df):
+    """Sérialise une (petite) table en Arrow IPC encodé en base64"""
+    sink = pa.BufferOutputStream()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return base64.b64encode(sink.getvalue().to_pybytes()).decode()
+
+
+def _decode_table(data):
+    return pa.ipc.open_stream(base64.b64decode(data)).read_all().to_pandas()
+
+
+def save_snapshot(table, path, watermark, signatures):
+    """Écrit le jeu en étoile et son tampon de version dans un fichier Arrow IPC
+
+    Les faits forment le corps du fichier ; les dimensions (petites) sont jointes
+    aux métadonnées du schéma, pour une écriture atomique d'un seul fichier.
+    """
+    metadata = {
+        'format': SNAPSHOT_FORMAT,
+        'watermark': {
+            'id': watermark['id'],
+            'created_on': watermark['created_on'].isoformat() if watermark['created_on'] is not None else None
+        },
+        'signatures': {name: list(signature) for name, signature in signatures.items()},
+        'dimensions': {name: _encode_table(dim) for name, dim in table.dimensions._asdict().items()}
+    }
+
+    facts = pa.Table.from_pandas(table.facts, preserve_index=False)
+    facts = facts.replace_schema_metadata({
+        **(facts.schema.metadata or {}),
+        METADATA_KEY: json.dumps(metadata).encode()
+    })
+
+    # Écriture dans un fichier temporaire puis remplacement atomique
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, facts.schema) as writer:
+            writer.write_table(facts)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path):
+    """Relit l'instantané en mémoire mappée ; retourne (table, watermark, signatures) ou None
+
+    Les colonnes numériques et horodatages sans valeur manquante restent des vues
+    en lecture seule sur le fichier mappé (``split_blocks`` : pas de consolidation
+    en blocs pandas) ; seuls les booléens et les catégories sont copiés.
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with pa.memory_map(path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+    except (pa.ArrowInvalid, OSError):
+        return None
+
+    metadata = json.loads((table.schema.metadata or {}).get(METADATA_KEY, b'{}'))
+    if metadata.get('format') != SNAPSHOT_FORMAT:
+        return None
+
+    watermark = metadata['watermark']
+    if watermark['created_on'] is not None:
+        watermark['created_on'] = pd.Timestamp(watermark['created_on'])
+    signatures = {table_name: tuple(signature) for table_name, signature in metadata['signatures'].items()}
+
+    dimensions = Dimensions(**{name: _decode_table(data) for name, data in metadata['dimensions'].items()})
+    return StarTable(table.to_pandas(split_blocks=True), dimensions), watermark, signatures
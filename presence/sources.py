@@ -0,0 +1,207 @@
+"""Sources des observations : base SQL ou fichiers d'export (CSV, Parquet partitionné)
+
+Une source fournit les signatures des dimensions, les tables produits et points
+de vente, et un lecteur en flux des observations au-delà d'un ``id``. Le
+chargeur (``IncrementalLoader``) ne dépend que de cette interface : les deux
+sources produisent le même jeu enrichi.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as pa_ds
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from presence.schema import POINTS_DE_VENTE_COLUMNS, PRODUITS_COLUMNS, TRACKING_COLUMNS, select_sql
+
+TABLE_TRACKING = "tracking_presence"
+TABLES_DIMENSIONS = ("produits", "points_de_vente")
+
+# Schéma explicite des exports (format de ``untitled.csv``) : aucune inférence de type
+TRACKING_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('visit_id', pa.int64()),
+    ('product_id', pa.int64()),
+    ('value', pa.bool_()),
+    ('created_on', pa.timestamp('us')),
+    ('id_point_de_vente', pa.string()),
+    ('segment', pa.string())
+])
+TRUE_VALUES = ['TRUE', 'True', 'true', 't', '1']
+FALSE_VALUES = ['FALSE', 'False', 'false', 'f', '0']
+CSV_BLOCK_BYTES = 16 * 1024 ** 2  # blocs lus et décodés en parallèle par le lecteur Arrow
+
+# Colonnes dont le type ne doit pas être inféré (codes d'apparence numérique, dates converties par build_dimensions)
+DIMENSION_TYPES = {
+    'produits': {'nom': pa.string(), 'marque': pa.string()},
+    'points_de_vente': {'nom': pa.string(), 'zone': pa.string(), 'date_ouverture': pa.string()}
+}
+DIMENSION_COLUMNS = {'produits': PRODUITS_COLUMNS, 'points_de_vente': POINTS_DE_VENTE_COLUMNS}
+
+
+def table_signature(engine, table):
+    """Retourne la signature (nombre de lignes, checksum) d'une table de dimension"""
+    if engine.dialect.name == 'postgresql':
+        # Checksum calculé côté serveur : seule une ligne remonte
+        query = f"SELECT count(*) AS n, md5(string_agg(t::text, '|' ORDER BY t::text)) AS checksum FROM {table} t"
+        row = pd.read_sql(query, engine).iloc[0]
+        return int(row['n']), row['checksum']
+
+    # Autres moteurs (SQLite de test...) : les dimensions sont petites, on hache localement
+    dimension = pd.read_sql(f"SELECT * FROM {table}", engine)
+    checksum = int(pd.util.hash_pandas_object(dimension, index=False).sum())
+    return len(dimension), checksum
+
+
+def as_source(source):
+    """Accepte un moteur SQLAlchemy (enveloppé dans ``SQLSource``) ou une source"""
+    return SQLSource(source) if isinstance(source, Engine) else source
+
+
+class SQLSource:
+    """Tables de la base (PostgreSQL en production, SQLite en local), lues par un curseur côté serveur"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __repr__(self):
+        return f"SQLSource({self.engine.url.render_as_string(hide_password=True)})"
+
+    def signatures(self):
+        """Signatures des tables de dimension, calculées en parallèle"""
+        with ThreadPoolExecutor(max_workers=len(TABLES_DIMENSIONS)) as executor:
+            return dict(zip(TABLES_DIMENSIONS, executor.map(lambda table: table_signature(self.engine, table), TABLES_DIMENSIONS)))
+
+    def read_dimension(self, name):
+        """Table ``produits`` ou ``points_de_vente`` (colonnes projetées)"""
+        return pd.read_sql(select_sql(name, DIMENSION_COLUMNS[name]), self.engine)
+
+    @contextmanager
+    def read_tracking(self, after_id=None):
+        """Lecteur en flux des observations d'``id`` supérieur à ``after_id`` : ``fetch(n)`` → DataFrame"""
+        params = {}
+        query = select_sql(TABLE_TRACKING, TRACKING_COLUMNS)
+        if after_id is not None:
+            query = select_sql(TABLE_TRACKING, TRACKING_COLUMNS, where="id > :last_id") + " ORDER BY id"
+            params['last_id'] = after_id
+
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(text(query), params)
+            colonnes = list(result.keys())
+            yield lambda n: pd.DataFrame.from_records(result.fetchmany(n), columns=colonnes)
+
+
+class FileSource:
+    """Exports sur disque : ``tracking_presence``, ``produits`` et ``points_de_vente`` dans ``directory``
+
+    Chaque table est un fichier ``<table>.csv`` ou ``<table>.parquet``, ou un
+    répertoire ``<table>/`` de tels fichiers (exports quotidiens, Parquet
+    partitionné à la Hive, ex. ``mois=2025-05/``). Les CSV sont décodés par le
+    lecteur multi-thread d'Arrow avec le schéma explicite ``TRACKING_SCHEMA``.
+
+    ``since`` / ``until`` bornent ``created_on`` : avec Parquet le filtre est
+    poussé au lecteur (groupes de lignes écartés sur leurs statistiques), tout
+    comme le filtre ``id > after_id`` des deltas.
+    """
+
+    def __init__(self, directory, since=None, until=None):
+        self.directory = directory
+        self.since = pd.Timestamp(since) if since is not None else None
+        self.until = pd.Timestamp(until) if until is not None else None
+
+    def __repr__(self):
+        return f"FileSource({self.directory!r})"
+
+    def _path(self, name):
+        for candidat in (name, f"{name}.parquet", f"{name}.csv"):
+            path = os.path.join(self.directory, candidat)
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f"Aucun export {name} (.csv, .parquet ou répertoire) dans {self.directory}")
+
+    def _files(self, name):
+        path = self._path(name)
+        if os.path.isfile(path):
+            return [path]
+        return sorted(
+            os.path.join(racine, fichier)
+            for racine, _, fichiers in os.walk(path)
+            for fichier in fichiers if fichier.endswith(('.csv', '.parquet'))
+        )
+
+    def _dataset(self, name, schema=None, column_types=None):
+        fichiers = self._files(name)
+        if not fichiers:
+            raise FileNotFoundError(f"Répertoire d'export {name} vide dans {self.directory}")
+        if fichiers[0].endswith('.parquet'):
+            return pa_ds.dataset(self._path(name), format='parquet', partitioning='hive')
+        file_format = pa_ds.CsvFileFormat(
+            convert_options=pa_csv.ConvertOptions(column_types=column_types or {}, true_values=TRUE_VALUES, false_values=FALSE_VALUES),
+            read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_BYTES)
+        )
+        return pa_ds.dataset(fichiers, format=file_format, schema=schema)
+
+    def signatures(self):
+        """Signatures des fichiers de dimension (taille, date de modification) : aucune relecture"""
+        signatures = {}
+        for name in TABLES_DIMENSIONS:
+            etats = [os.stat(fichier) for fichier in self._files(name)]
+            signatures[name] = (sum(etat.st_size for etat in etats), max(etat.st_mtime_ns for etat in etats))
+        return signatures
+
+    def read_dimension(self, name):
+        """Table ``produits`` ou ``points_de_vente`` (colonnes projetées)"""
+        dataset = self._dataset(name, column_types=DIMENSION_TYPES[name])
+        return dataset.to_table(columns=DIMENSION_COLUMNS[name]).to_pandas()
+
+    def _filter(self, after_id):
+        conditions = []
+        if after_id is not None:
+            conditions.append(pa_ds.field('id') > after_id)
+        if self.since is not None:
+            conditions.append(pa_ds.field('created_on') >= self.since.to_pydatetime())
+        if self.until is not None:
+            conditions.append(pa_ds.field('created_on') < self.until.to_pydatetime())
+        filtre = None
+        for condition in conditions:
+            filtre = condition if filtre is None else filtre & condition
+        return filtre
+
+    @contextmanager
+    def read_tracking(self, after_id=None):
+        """Lecteur en flux des observations d'``id`` supérieur à ``after_id`` : ``fetch(n)`` → DataFrame"""
+        dataset = self._dataset(TABLE_TRACKING, schema=TRACKING_SCHEMA, column_types=TRACKING_SCHEMA)
+        batches = dataset.to_batches(columns=TRACKING_COLUMNS, filter=self._filter(after_id), use_threads=True)
+        yield _BatchFetcher(batches, TRACKING_SCHEMA).fetch
+
+
+class _BatchFetcher:
+    """Regroupe des lots Arrow de tailles quelconques en blocs de ``n`` lignes convertis en pandas"""
+
+    def __init__(self, batches, schema):
+        self._batches = iter(batches)
+        self._schema = schema
+        self._buffer = []
+        self._rows = 0
+
+    def fetch(self, n):
+        while self._rows < n:
+            batch = next(self._batches, None)
+            if batch is None:
+                break
+            if batch.num_rows:
+                # Types unifiés entre fichiers (ex. horodatages Parquet en ns)
+                self._buffer.append(pa.Table.from_batches([batch]).cast(self._schema, safe=False))
+                self._rows += batch.num_rows
+
+        if not self._buffer:
+            return self._schema.empty_table().to_pandas()
+        table = pa.concat_tables(self._buffer)
+        reste = table.slice(n)
+        self._buffer = [reste] if reste.num_rows else []
+        self._rows = reste.num_rows
+        return table.slice(0, n).to_pandas()
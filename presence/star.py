@@ -0,0 +1,193 @@
+"""Modèle en étoile en mémoire : table de faits étroite et dimensions résolues par ``take``"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from presence.calendar import CALENDAR_COLUMNS, build_calendar, calendar_positions, day_keys, merge_calendars
+from presence.schema import DASHBOARD_COLUMNS, FACT_COLUMNS, compact, concat_rows
+
+# Attributs portés par les dimensions (une ligne par produit / point de vente)
+PRODUCT_ATTRIBUTES = ['nom_produit', 'marque']
+STORE_ATTRIBUTES = ['nom_point_vente', 'zone', 'latitude', 'longitude', 'date_ouverture']
+
+# Attributs du jour de date_reference, portés par le calendrier (joint par ``day_key``)
+CALENDAR_ATTRIBUTES = [col for col in CALENDAR_COLUMNS if col != 'day_key']
+
+# Tables de dimensions : produits et points de vente indexés par position (la dernière
+# ligne, vide, sert aux clés inconnues) ; calendrier trié par ``day_key``
+Dimensions = namedtuple('Dimensions', ['produits', 'points_de_vente', 'calendrier'])
+
+
+def build_dimensions(produits, points_de_vente):
+    """Construit les dimensions compactes à partir des tables produits et points de vente
+
+    Une clé en double n'est retenue qu'une fois (la première).
+    """
+    produits = produits.drop_duplicates('id')
+    dim_produits = pd.DataFrame({
+        'product_id': pd.to_numeric(produits['id']).to_numpy(),
+        'nom_produit': produits['nom'].to_numpy(),
+        'marque': produits['marque'].to_numpy()
+    })
+
+    points_de_vente = points_de_vente.assign(nom=points_de_vente['nom'].astype(str)).drop_duplicates('nom')
+    dim_points_de_vente = pd.DataFrame({
+        'nom_point_vente': points_de_vente['nom'].to_numpy(),
+        'zone': points_de_vente['zone'].to_numpy(),
+        'latitude': pd.to_numeric(points_de_vente['latitude'], errors='coerce').to_numpy(),
+        'longitude': pd.to_numeric(points_de_vente['longitude'], errors='coerce').to_numpy(),
+        'date_ouverture': pd.to_datetime(points_de_vente['date_ouverture'], errors='coerce').to_numpy()
+    })
+
+    dimensions = []
+    for dim in (dim_produits, dim_points_de_vente):
+        dim = dim.reindex(range(len(dim) + 1))  # ligne vide finale
+        for col in dim.columns:
+            if pd.api.types.is_string_dtype(dim[col]):
+                dim[col] = dim[col].astype('category')
+        dimensions.append(dim)
+    return Dimensions(*dimensions, build_calendar([]))
+
+
+def encode_facts(tracking, dimensions):
+    """Code les observations brutes en faits : clés entières des dimensions, valeur et dates
+
+    Les identifiants de points de vente sont convertis en texte sur leurs seules
+    valeurs distinctes (``factorize``) avant la correspondance avec la dimension.
+    """
+    produits, points_de_vente, _ = dimensions
+
+    ids_produits = pd.Index(produits['product_id'].iloc[:-1])
+    product_key = ids_produits.get_indexer(pd.to_numeric(tracking['product_id']))
+    product_key[product_key < 0] = len(produits) - 1
+
+    codes, modalites = pd.factorize(tracking['id_point_de_vente'])
+    positions = pd.Index(points_de_vente['nom_point_vente'].iloc[:-1].astype(str)).get_indexer(modalites.astype(str))
+    positions[positions < 0] = len(points_de_vente) - 1
+    store_key = np.append(positions, len(points_de_vente) - 1)[codes]
+
+    created_on = pd.to_datetime(tracking['created_on']).reset_index(drop=True)
+    date_ouverture = pd.Series(points_de_vente['date_ouverture'].to_numpy()[store_key])
+
+    # date_reference : date d'ouverture du point de vente si disponible, sinon created_on
+    date_reference = date_ouverture.fillna(created_on)
+    facts = pd.DataFrame({
+        'product_id': tracking['product_id'].to_numpy(),
+        'product_key': product_key.astype(_key_dtype(len(produits))),
+        'store_key': store_key.astype(_key_dtype(len(points_de_vente))),
+        'visit_id': tracking['visit_id'].to_numpy(),
+        'value': tracking['value'].to_numpy(),
+        'created_on': created_on,
+        'segment': tracking['segment'].to_numpy(),
+        'date_reference': date_reference,
+        'day_key': day_keys(date_reference)
+    })
+    return compact(facts)
+
+
+def recode_facts(table, dimensions):
+    """Recode les faits d'une table sur de nouvelles dimensions, sans relire les observations
+
+    Les produits sont retrouvés par ``product_id`` (porté par les faits), les points
+    de vente par leur nom dans l'ancienne dimension ; ``date_reference`` et le
+    calendrier suivent les dates d'ouverture des nouvelles dimensions. Un fait dont
+    le point de vente était inconnu reste inconnu (son identifiant n'est pas conservé).
+    """
+    facts = table.facts
+    observations = pd.DataFrame({
+        'product_id': facts['product_id'].to_numpy(),
+        'visit_id': facts['visit_id'].to_numpy(),
+        'value': facts['value'].to_numpy(),
+        'created_on': facts['created_on'].to_numpy(),
+        'id_point_de_vente': table['nom_point_vente'].to_numpy(),
+        'segment': facts['segment'].to_numpy()
+    })
+    return with_calendar(encode_facts(observations, dimensions), dimensions)
+
+
+def with_calendar(facts, dimensions):
+    """Table en étoile dont le calendrier couvre les jours des faits"""
+    return StarTable(facts, dimensions._replace(calendrier=build_calendar(facts['day_key'].to_numpy())))
+
+
+def _key_dtype(n):
+    return 'int16' if n < 2 ** 15 else 'int32'
+
+
+class StarTable:
+    """Observations au format étoile, vues comme un jeu « large » en lecture
+
+    ``table['marque']`` résout l'attribut par un ``take`` sur la dimension (codes
+    de catégorie pour les textes) ; ``table[['marque', 'zone']]`` retourne un
+    DataFrame large limité aux colonnes demandées. Seuls les faits (quelques
+    entiers par ligne) sont stockés : ``take`` et la concaténation ne copient
+    jamais les attributs des dimensions, partagées entre toutes les vues.
+    """
+
+    def __init__(self, facts, dimensions):
+        self.facts = facts
+        self.dimensions = dimensions
+
+    @property
+    def columns(self):
+        return list(DASHBOARD_COLUMNS)
+
+    def __len__(self):
+        return len(self.facts)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._column(key)
+        return pd.DataFrame({col: self._column(col) for col in key}, index=self.facts.index)
+
+    def _column(self, col):
+        if col in FACT_COLUMNS:
+            return self.facts[col]
+        if col in PRODUCT_ATTRIBUTES:
+            return self._lookup(self.dimensions.produits[col], 'product_key')
+        if col in STORE_ATTRIBUTES:
+            return self._lookup(self.dimensions.points_de_vente[col], 'store_key')
+        if col in CALENDAR_ATTRIBUTES:
+            calendrier = self.dimensions.calendrier
+            positions = calendar_positions(calendrier, self.facts['day_key'].to_numpy())
+            valeurs = calendrier[col].array.take(positions, allow_fill=bool((positions < 0).any()))
+            return pd.Series(valeurs, index=self.facts.index, name=col)
+        raise KeyError(col)
+
+    def _lookup(self, attribut, key):
+        valeurs = attribut.array.take(self.facts[key].to_numpy())
+        return pd.Series(valeurs, index=self.facts.index, name=attribut.name)
+
+    def take(self, positions):
+        """Sous-ensemble de lignes (faits seulement), dimensions partagées"""
+        return StarTable(self.facts.take(positions).reset_index(drop=True), self.dimensions)
+
+    def to_pandas(self, columns=None):
+        """Jeu large (colonnes du dashboard), à réserver aux extraits affichés ou exportés"""
+        return self[list(columns or self.columns)]
+
+    def iter_chunks(self, chunk_rows):
+        """Parcourt le jeu large par blocs (export)"""
+        for debut in range(0, len(self), chunk_rows):
+            yield StarTable(self.facts.iloc[debut:debut + chunk_rows], self.dimensions).to_pandas()
+
+    def arrow_schema(self):
+        """Schéma Arrow des blocs de ``iter_chunks`` (types des faits et des dimensions)"""
+        vide = StarTable(self.facts.iloc[:0], self.dimensions).to_pandas()
+        return pa.Schema.from_pandas(vide, preserve_index=False)
+
+    def memory_usage(self, deep=True):
+        """Empreinte des faits et des dimensions (à la manière de ``DataFrame.memory_usage``)"""
+        return pd.concat([
+            self.facts.memory_usage(deep=deep),
+            self.dimensions.produits.memory_usage(deep=deep).add_prefix('produits.'),
+            self.dimensions.points_de_vente.memory_usage(deep=deep).add_prefix('points_de_vente.')
+        ])
+
+
+def concat_tables(tables):
+    """Concatène des tables partageant les mêmes dimensions produits et points de vente"""
+    calendrier = merge_calendars([table.dimensions.calendrier for table in tables])
+    return StarTable(concat_rows([table.facts for table in tables]), tables[0].dimensions._replace(calendrier=calendrier))
@@ -0,0 +1,219 @@
+"""Ruptures (visites consécutives sans présence) et tendance de présence par point de vente × produit
+
+L'état est tenu par couple (point de vente, produit) et mis à jour par les seuls
+nouveaux faits : série d'absences en cours, dates de dernière visite et de
+dernière présence, et historique des ``2 × window`` dernières visites (fenêtre
+récente et fenêtre précédente du taux de présence glissant).
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_WINDOW = 5  # visites par fenêtre du taux de présence glissant
+DEFAULT_MIN_STREAK = 3  # visites consécutives sans présence déclenchant une alerte de rupture
+DEFAULT_TREND_DROP = 0.3  # baisse du taux de présence (fraction) entre les deux fenêtres
+
+STREAK_COLUMNS = [
+    'nom_point_vente', 'zone', 'product_id', 'nom_produit', 'marque',
+    'serie_absence', 'visites', 'derniere_visite', 'derniere_presence',
+    'taux_recent', 'taux_precedent', 'tendance'
+]
+
+
+def _pair_codes(store_key, product_id):
+    """Code entier unique d'un couple (clé du point de vente, identifiant produit)"""
+    return (store_key.astype(np.int64) << 32) | product_id.astype(np.int64)
+
+
+def visits(table):
+    """Une ligne par (point de vente, produit, visite)
+
+    Un produit relevé plusieurs fois dans une même visite est présent si l'un des
+    relevés l'est. Les faits sans point de vente connu ou sans visite sont écartés.
+    """
+    facts = table.facts
+    sentinelle = len(table.dimensions.points_de_vente) - 1
+    garde = (facts['store_key'].to_numpy() != sentinelle) & facts['visit_id'].notna().to_numpy()
+    faits = facts.loc[garde, ['store_key', 'product_id', 'visit_id', 'value', 'created_on']]
+    if len(faits) == 0:
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in (('pair', 'int64'), ('visit_id', 'int64'), ('value', bool), ('created_on', 'datetime64[us]'))})
+
+    faits = faits.assign(pair=_pair_codes(faits['store_key'].to_numpy(), faits['product_id'].to_numpy()))
+    parvisite = faits.groupby(['pair', 'visit_id'], sort=False).agg(value=('value', 'max'), created_on=('created_on', 'min')).reset_index()
+    return parvisite[['pair', 'visit_id', 'value', 'created_on']]
+
+
+class StreakState:
+    """État des ruptures d'une version des données, mis à jour par ``update``
+
+    Chaque couple garde ses ``2 × window`` dernières visites (valeur, date,
+    identifiant) : une visite déjà vue qui se poursuit dans le delta y est
+    fusionnée, et une visite arrivée en retard y reprend sa place dans l'ordre
+    de ``created_on``. Seule une présence arrivée après plus de ``2 × window``
+    visites plus récentes du même couple n'est pas replacée exactement.
+
+    ``update`` retourne un nouvel état (les tableaux modifiés sont copiés) : un
+    lecteur de la version publiée n'est jamais affecté par le rafraîchissement.
+    Les clés de points de vente sont celles des dimensions de la table : l'état
+    est reconstruit quand elles sont recodées (dimensions modifiées).
+    """
+
+    def __init__(self, dimensions, window=DEFAULT_WINDOW):
+        self.dimensions = dimensions
+        self.window = window
+        self.pairs = pd.Index([], dtype='int64')
+        self.serie = np.zeros(0, dtype=np.int32)
+        self.visites = np.zeros(0, dtype=np.int32)
+        self.derniere_presence = np.zeros(0, dtype='datetime64[us]')
+        # Dernières visites de chaque couple, la plus récente en colonne 0 (-1 / NaT : aucune)
+        self.historique = np.zeros((0, 2 * window), dtype=np.int8)
+        self.dates = np.zeros((0, 2 * window), dtype='datetime64[us]')
+        self.visit_ids = np.zeros((0, 2 * window), dtype=np.int64)
+
+    @classmethod
+    def from_table(cls, table, window=DEFAULT_WINDOW):
+        """État complet calculé sur toutes les observations de ``table``"""
+        return cls(table.dimensions, window).update(table)
+
+    @property
+    def derniere_visite(self):
+        return self.dates[:, 0]
+
+    def update(self, table):
+        """Nouvel état intégrant les faits de ``table`` (delta)"""
+        delta = visits(table)
+        etat = self._copy(table.dimensions)
+        if len(delta) == 0:
+            return etat
+
+        nouveaux = pd.Index(delta['pair'].unique()).difference(etat.pairs)
+        if len(nouveaux):
+            etat._grow(nouveaux)
+        couples = etat.pairs.get_indexer(delta['pair'].unique())
+        largeur = etat.historique.shape[1]
+
+        # Visites gardées des couples touchés + visites du delta, fusionnées par identifiant
+        garde = etat.historique[couples] >= 0
+        lignes = np.repeat(couples, garde.sum(axis=1))
+        anciennes = pd.DataFrame({
+            'couple': lignes,
+            'visit_id': etat.visit_ids[couples][garde],
+            'value': etat.historique[couples][garde].astype(bool),
+            'created_on': etat.dates[couples][garde],
+            'nouvelle': False
+        })
+        recentes = pd.DataFrame({
+            'couple': etat.pairs.get_indexer(delta['pair'].to_numpy()),
+            'visit_id': delta['visit_id'].to_numpy(dtype=np.int64),
+            'value': delta['value'].to_numpy(dtype=bool),
+            'created_on': delta['created_on'].to_numpy().astype('datetime64[us]'),
+            'nouvelle': True
+        })
+        v = pd.concat([anciennes, recentes], ignore_index=True).groupby(['couple', 'visit_id'], sort=False).agg(
+            value=('value', 'max'), created_on=('created_on', 'min'), nouvelle=('nouvelle', 'min')
+        ).reset_index()
+        ordre = np.lexsort((v['visit_id'].to_numpy(), v['created_on'].to_numpy(), v['couple'].to_numpy()))
+        v = v.take(ordre)
+
+        positions = v['couple'].to_numpy()
+        valeurs = v['value'].to_numpy(dtype=bool)
+        dates = v['created_on'].to_numpy()
+        n = len(v)
+        debuts = np.flatnonzero(np.r_[True, positions[1:] != positions[:-1]])
+        fins = np.r_[debuts[1:], n]
+        tailles = fins - debuts
+        couples = positions[debuts]
+        ajoutees = np.add.reduceat(v['nouvelle'].to_numpy().astype(np.int32), debuts)
+
+        # Série en cours : absences après la dernière présence connue, sinon prolongement de la série
+        derniere = np.maximum.reduceat(np.where(valeurs, np.arange(n), -1), debuts)
+        present = derniere >= debuts
+        etat.serie[couples] = np.where(present, fins - 1 - derniere, etat.serie[couples] + ajoutees)
+        presence = np.where(present, dates[np.maximum(derniere, 0)], np.datetime64('NaT'))
+        etat.derniere_presence[couples] = np.fmax(etat.derniere_presence[couples], presence)
+        etat.visites[couples] += ajoutees
+
+        # Historique : les ``largeur`` visites les plus récentes de chaque couple
+        rang = np.repeat(fins, tailles) - 1 - np.arange(n)  # 0 = visite la plus récente du couple
+        groupe = np.repeat(np.arange(len(couples)), tailles)
+        retenue = rang < largeur
+        historique = np.full((len(couples), largeur), -1, dtype=np.int8)
+        historique_dates = np.full((len(couples), largeur), np.datetime64('NaT'), dtype='datetime64[us]')
+        historique_ids = np.full((len(couples), largeur), -1, dtype=np.int64)
+        historique[groupe[retenue], rang[retenue]] = valeurs[retenue]
+        historique_dates[groupe[retenue], rang[retenue]] = dates[retenue]
+        historique_ids[groupe[retenue], rang[retenue]] = v['visit_id'].to_numpy()[retenue]
+        etat.historique[couples] = historique
+        etat.dates[couples] = historique_dates
+        etat.visit_ids[couples] = historique_ids
+        return etat
+
+    def _copy(self, dimensions):
+        etat = StreakState(dimensions, self.window)
+        etat.pairs = self.pairs
+        for nom in ('serie', 'visites', 'derniere_presence', 'historique', 'dates', 'visit_ids'):
+            setattr(etat, nom, getattr(self, nom).copy())
+        return etat
+
+    def _grow(self, nouveaux):
+        k = len(nouveaux)
+        largeur = self.historique.shape[1]
+        self.pairs = self.pairs.append(nouveaux)
+        self.serie = np.concatenate([self.serie, np.zeros(k, dtype=np.int32)])
+        self.visites = np.concatenate([self.visites, np.zeros(k, dtype=np.int32)])
+        self.derniere_presence = np.concatenate([self.derniere_presence, np.full(k, np.datetime64('NaT'), dtype='datetime64[us]')])
+        self.historique = np.concatenate([self.historique, np.full((k, largeur), -1, dtype=np.int8)])
+        self.dates = np.concatenate([self.dates, np.full((k, largeur), np.datetime64('NaT'), dtype='datetime64[us]')])
+        self.visit_ids = np.concatenate([self.visit_ids, np.full((k, largeur), -1, dtype=np.int64)])
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def rolling_rates(self):
+        """Taux de présence des fenêtres récente et précédente (NaN si la fenêtre est incomplète)"""
+        def taux(bloc):
+            releves = (bloc >= 0).sum(axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return np.where(releves == self.window, (bloc == 1).sum(axis=1) / releves, np.nan)
+        return taux(self.historique[:, :self.window]), taux(self.historique[:, self.window:])
+
+    def to_frame(self):
+        """Une ligne par couple : série en cours, visites, taux glissants et tendance"""
+        codes = self.pairs.to_numpy()
+        store_key = (codes >> 32).astype(np.intp)
+        product_id = (codes & 0xFFFFFFFF).astype(np.int64)
+        points_de_vente = self.dimensions.points_de_vente
+        produits = self.dimensions.produits.iloc[:-1].drop_duplicates('product_id').set_index('product_id')
+        recent, precedent = self.rolling_rates()
+        frame = pd.DataFrame({
+            'nom_point_vente': points_de_vente['nom_point_vente'].array.take(store_key),
+            'zone': points_de_vente['zone'].array.take(store_key),
+            'product_id': product_id,
+            'nom_produit': produits['nom_produit'].reindex(product_id).array,
+            'marque': produits['marque'].reindex(product_id).array,
+            'serie_absence': self.serie,
+            'visites': self.visites,
+            'derniere_visite': self.derniere_visite,
+            'derniere_presence': self.derniere_presence,
+            'taux_recent': recent,
+            'taux_precedent': precedent,
+            'tendance': recent - precedent
+        })
+        return frame[STREAK_COLUMNS]
+
+    def alerts(self, min_streak=DEFAULT_MIN_STREAK, trend_drop=DEFAULT_TREND_DROP, marques=None, zones=None):
+        """Couples en rupture (``min_streak`` visites sans présence) ou en baisse de présence
+
+        ``alerte`` vaut « rupture » ou « baisse » ; les ruptures les plus longues
+        viennent en premier, puis les plus fortes baisses.
+        """
+        frame = self.to_frame()
+        rupture = frame['serie_absence'] >= min_streak
+        baisse = frame['tendance'] <= -trend_drop
+        garde = rupture | baisse
+        if marques:
+            garde &= frame['marque'].isin(marques)
+        if zones:
+            garde &= frame['zone'].isin(zones)
+        alertes = frame[garde].copy()
+        alertes.insert(0, 'alerte', np.where(rupture[garde], 'rupture', 'baisse'))
+        return alertes.sort_values(['serie_absence', 'tendance'], ascending=[False, True], kind='stable').reset_index(drop=True)
@@ -0,0 +1,72 @@
+"""Séries temporelles : granularité adaptative et sous-échantillonnage LTTB"""
+import numpy as np
+import pandas as pd
+
+# Point de bascule (en jours couverts) vers une granularité plus grossière
+GRANULARITY_THRESHOLDS = (('jour', 92), ('semaine', 731))
+DEFAULT_POINT_BUDGET = 400
+
+
+def choose_granularity(date_min, date_max):
+    """Choisit jour / semaine / mois selon l'étendue de la période sélectionnée"""
+    jours = (pd.Timestamp(date_max) - pd.Timestamp(date_min)).days
+    for granularite, limite in GRANULARITY_THRESHOLDS:
+        if jours <= limite:
+            return granularite
+    return 'mois'
+
+
+def resample_stats(daily_stats, granularity):
+    """Regroupe des statistiques journalières (date, Observations, Presences) par semaine ISO ou par mois"""
+    if granularity == 'jour':
+        return daily_stats
+
+    dates = pd.to_datetime(daily_stats['date'])
+    if granularity == 'semaine':
+        # Lundi de la semaine ISO
+        periode = dates - pd.to_timedelta(dates.dt.weekday, unit='D')
+    else:
+        periode = dates.dt.to_period('M').dt.to_timestamp()
+
+    stats = daily_stats.groupby(periode.rename('date'))[['Observations', 'Presences']].sum()
+    stats['Taux_Presence'] = (stats['Presences'] / stats['Observations']).round(3)
+    return stats.reset_index()
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets : indices des points conservant la forme de la série"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    indices = np.empty(threshold, dtype='int64')
+    indices[0], indices[-1] = 0, n - 1
+
+    # Les points intérieurs sont répartis en (threshold - 2) paquets
+    bornes = np.linspace(1, n - 1, threshold - 1).astype('int64')
+    precedent = 0
+    for i in range(threshold - 2):
+        debut, fin = bornes[i], bornes[i + 1]
+        suivant_debut, suivant_fin = bornes[i + 1], bornes[i + 2] if i + 2 < len(bornes) else n
+        moyenne_x = x[suivant_debut:suivant_fin].mean()
+        moyenne_y = y[suivant_debut:suivant_fin].mean()
+
+        # Point du paquet formant le plus grand triangle avec le point retenu précédent
+        aires = np.abs(
+            (x[precedent] - moyenne_x) * (y[debut:fin] - y[precedent])
+            - (x[precedent] - x[debut:fin]) * (moyenne_y - y[precedent])
+        )
+        precedent = debut + int(np.argmax(aires))
+        indices[i + 1] = precedent
+
+    return indices
+
+
+def downsample(stats, column, point_budget):
+    """Retourne (x, y) de ``column`` réduits à ``point_budget`` points au plus"""
+    x = pd.to_datetime(stats['date'])
+    y = stats[column].to_numpy()
+    indices = lttb(x.to_numpy().astype('int64'), y, point_budget)
+    return x.to_numpy()[indices], y[indices]
@@ -0,0 +1,33 @@
+"""Jeux synthétiques partagés par les tests (générés une fois par session)"""
+import shutil
+
+import pytest
+from sqlalchemy import create_engine
+
+from benchmarks.generator import write_sqlite
+
+N_ROWS = 20_000
+
+
+@pytest.fixture(scope='session')
+def n_rows():
+    """Nombre d'observations des jeux générés"""
+    return N_ROWS
+
+
+@pytest.fixture(scope='session')
+def sqlite_path(tmp_path_factory):
+    """Base SQLite générée : tables tracking_presence, produits et points_de_vente"""
+    return write_sqlite(str(tmp_path_factory.mktemp('presence') / 'presence.db'), N_ROWS)
+
+
+@pytest.fixture
+def db_engine(sqlite_path, tmp_path):
+    """Copie modifiable de la base générée (une par test)"""
+    path = shutil.copy(sqlite_path, tmp_path / 'presence.db')
+    return create_engine(f"sqlite:///{path}")
+
+
+def sorted_rows(df, keys=('date', 'product_id', 'nom_point_vente')):
+    """Lignes triées par ``keys`` (par défaut celles du cube) : l'ordre de chargement n'est pas comparé"""
+    return df.sort_values(list(keys), kind='stable').reset_index(drop=True)
@@ -0,0 +1,63 @@
+"""Dimension calendrier : attributs calculés une fois par jour, résolus par ``day_key``"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from presence import engine
+from presence.calendar import build_calendar, calendar_positions, day_keys, merge_calendars
+
+
+def test_day_keys_mark_missing_dates():
+    keys = day_keys(pd.to_datetime(['1970-01-02 00:00', None, '2025-03-01 17:45']))
+    assert keys.tolist() == [1, -1, (pd.Timestamp('2025-03-01') - pd.Timestamp('1970-01-01')).days]
+
+
+def test_calendar_attributes_match_pandas():
+    dates = pd.date_range('2024-12-25', '2026-01-10', freq='D')
+    calendrier = build_calendar(day_keys(np.repeat(dates, 3)))
+    iso = dates.isocalendar()
+
+    assert len(calendrier) == len(dates)
+    assert (calendrier['date'].to_numpy() == dates.as_unit('us').to_numpy()).all()
+    assert calendrier['annee'].tolist() == dates.year.tolist()
+    assert calendrier['mois'].tolist() == dates.month.tolist()
+    assert calendrier['trimestre'].tolist() == dates.quarter.tolist()
+    assert calendrier['semaine'].tolist() == iso['week'].tolist()
+    assert calendrier['annee_iso'].tolist() == iso['year'].tolist()
+    assert calendrier['jour_semaine'].astype(str).tolist() == dates.day_name().tolist()
+    assert calendrier['weekend'].tolist() == (dates.dayofweek >= 5).tolist()
+    assert calendrier.loc[calendrier['date'] == '2025-05-01', 'jour_ferie'].item()
+    assert not calendrier.loc[calendrier['date'] == '2025-05-02', 'jour_ferie'].item()
+
+
+def test_movable_holidays_from_table_and_environment(monkeypatch):
+    monkeypatch.setenv('PRESENCE_MOVABLE_HOLIDAYS', '2026-03-20, 2026-03-21')
+    dates = pd.to_datetime(['2025-03-31', '2025-04-02', '2025-06-07', '2026-03-21'])
+    calendrier = build_calendar(day_keys(dates))
+    # Aïd al-Fitr et Aïd al-Adha 2025 (table), Aïd al-Fitr 2026 (variable d'environnement)
+    assert calendrier['jour_ferie'].tolist() == [True, False, True, True]
+
+
+def test_merge_and_positions():
+    premier = build_calendar(day_keys(pd.to_datetime(['2025-01-01', '2025-01-03'])))
+    second = build_calendar(day_keys(pd.to_datetime(['2025-01-02', '2025-01-03'])))
+    fusion = merge_calendars([premier, second])
+    assert fusion['date'].dt.day.tolist() == [1, 2, 3]
+    assert merge_calendars([premier, premier]) is premier
+
+    cles = day_keys(pd.to_datetime(['2025-01-03', '2025-01-05', None]))
+    assert calendar_positions(fusion, cles).tolist() == [2, -1, -1]
+
+
+def test_star_table_resolves_calendar_from_date_reference(sqlite_path):
+    dataset = engine.load(create_engine(f"sqlite:///{sqlite_path}"))
+    large = dataset.df.to_pandas(['date_reference', 'date', 'annee', 'mois', 'semaine', 'jour_semaine'])
+    reference = large['date_reference']
+
+    assert (large['date'] == reference.dt.normalize()).all()
+    assert (large['annee'] == reference.dt.year).all()
+    assert (large['mois'] == reference.dt.month).all()
+    assert (large['semaine'] == reference.dt.isocalendar()['week']).all()
+    assert (large['jour_semaine'].astype(str) == reference.dt.day_name()).all()
+    # Une ligne de calendrier par jour distinct des observations
+    assert len(dataset.df.dimensions.calendrier) == reference.dt.normalize().nunique()
@@ -0,0 +1,75 @@
+"""Équivalence des moteurs d'agrégation sur une base SQLite générée
+
+Le mode agrégation en base (``PushdownSelection``) et le moteur DuckDB doivent
+donner les mêmes KPIs et agrégats que le cube pandas de référence ; la grille
+géographique précalculée (``GeoGrid``) les mêmes points et cellules.
+"""
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from conftest import sorted_rows
+from presence import engine
+from presence.backends import create_backend, verify_equivalence
+from presence.geo import MAX_MARKERS, GeoGrid
+from presence.pushdown import PushdownSelection
+
+@pytest.fixture(scope='module')
+def sql_engine(sqlite_path):
+    """Base générée de la session, en lecture seule"""
+    return create_engine(f"sqlite:///{sqlite_path}")
+
+
+@pytest.fixture(scope='module')
+def dataset(sql_engine):
+    return engine.load(sql_engine)
+
+
+@pytest.fixture(scope='module')
+def filters_list(dataset):
+    options = engine.options(dataset)
+    debut, fin = options['date_min'], options['date_max']
+    milieu = debut + (fin - debut) / 2
+    return [
+        engine.Filters(),
+        engine.default_filters(options),
+        engine.Filters((debut.date(), milieu.date()), options['marque'][:3]),
+        engine.Filters((milieu.date(), fin.date()), None, options['segment'][:1], options['zone'][:2])
+    ]
+
+
+def _sorted(stats, name):
+    return sorted_rows(stats.reset_index(), engine.ROLLUPS[name][0])
+
+
+def test_pushdown_matches_cube(sql_engine, dataset, filters_list):
+    for filters in filters_list:
+        attendu = engine.select(dataset, filters)
+        obtenu = PushdownSelection(sql_engine, *filters)
+
+        assert engine.kpis(obtenu) == pytest.approx(engine.kpis(attendu)), filters
+        for name in engine.ROLLUPS:
+            pd.testing.assert_frame_equal(
+                _sorted(engine.aggregate(obtenu, name), name),
+                _sorted(engine.aggregate(attendu, name), name),
+                check_dtype=False, check_categorical=False, check_index_type=False,
+                obj=f"{name} {filters}"
+            )
+
+
+def test_duckdb_matches_pandas(dataset, filters_list):
+    pytest.importorskip('duckdb')
+    assert verify_equivalence(create_backend('duckdb', dataset.cube), filters_list) == []
+
+
+def test_geo_grid_matches_cube(dataset, filters_list):
+    grid = GeoGrid(dataset.cube)
+    for filters in filters_list:
+        for max_markers in (MAX_MARKERS, 20):
+            attendu, taille_attendue = engine.geo_stats(engine.select(dataset, filters), max_markers)
+            obtenu, taille = engine.geo_stats(None, max_markers, grid, filters)
+            assert taille == taille_attendue, filters
+            pd.testing.assert_frame_equal(
+                obtenu.reset_index(drop=True), attendu.reset_index(drop=True),
+                check_dtype=False, check_categorical=False, obj=f"geo {filters}"
+            )
@@ -0,0 +1,79 @@
+"""Explorateur paginé : pages disjointes, recherche et tri côté serveur"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from presence.explorer import Explorer
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'marque': pd.Categorical(['Zeta', 'alpha', 'Beta', 'alpha', None, 'Gamma', 'Zeta']),
+        'nom_point_vente': ['PDV-A', 'PDV-B', 'pdv-c', 'PDV-D', 'PDV-E', 'PDV-F', 'PDV-G'],
+        'value': [True, False, True, True, False, None, False],
+        'created_on': pd.to_datetime(['2025-03-01', '2025-01-01', None, '2025-02-01', '2025-01-15', '2025-01-01', '2025-04-01'])
+    })
+
+
+def test_pages_cover_all_rows_once(df):
+    explorer = Explorer(df)
+    pages = []
+    for page in range(3):
+        lignes, total = explorer.page(page, 3)
+        assert total == len(df)
+        pages.append(lignes)
+    assert [len(p) for p in pages] == [3, 3, 1]
+    pd.testing.assert_frame_equal(pd.concat(pages), df)
+    assert explorer.page(5, 3)[0].empty
+
+
+def test_search_is_case_insensitive_on_categories_and_text(df):
+    explorer = Explorer(df)
+    lignes, total = explorer.page(0, 10, search='  ALPHA ')
+    assert total == 2 and list(lignes.index) == [1, 3]
+
+    lignes, total = explorer.page(0, 10, search='pdv-c')
+    assert total == 1 and lignes['marque'].iloc[0] == 'Beta'
+
+    assert explorer.page(0, 10, search='introuvable')[1] == 0
+
+
+def test_sort_is_alphabetical_stable_with_missing_last(df):
+    explorer = Explorer(df)
+    lignes, _ = explorer.page(0, 10, sort_by='marque')
+    # Modalités par ordre alphabétique (pas l'ordre d'arrivée), ex æquo dans l'ordre d'origine
+    assert list(lignes.index) == [2, 5, 0, 6, 1, 3, 4]
+
+    lignes, _ = explorer.page(0, 10, sort_by='created_on', ascending=False)
+    assert list(lignes.index) == [6, 0, 3, 4, 1, 5, 2]
+
+
+def test_page_applies_search_sort_and_columns(df):
+    explorer = Explorer(df)
+    lignes, total = explorer.page(1, 1, sort_by='created_on', search='pdv', columns=['nom_point_vente'])
+    attendu = df.sort_values('created_on', kind='stable', na_position='last')
+    assert total == len(df)
+    assert list(lignes.columns) == ['nom_point_vente']
+    assert lignes['nom_point_vente'].iloc[0] == attendu['nom_point_vente'].iloc[1]
+    assert np.array_equal(explorer._order('created_on', True, 'pdv'), attendu.index.to_numpy())
+
+
+def test_unsorted_pages_build_no_order(df):
+    explorer = Explorer(df)
+    lignes, total = explorer.page(2, 3)
+    assert total == len(df) and list(lignes.index) == [6]
+    assert not explorer._orders
+
+
+def test_order_cache_is_bounded_by_bytes():
+    df = pd.DataFrame({'marque': pd.Categorical(np.arange(1_000) % 7), 'valeur': np.arange(1_000)})
+    # Un ordre de 1 000 positions int32 occupe 4 000 octets : deux tiennent dans le plafond
+    explorer = Explorer(df, max_order_mb=9_000 / 1024 ** 2)
+    for col in ('marque', 'valeur'):
+        explorer.page(0, 10, sort_by=col)
+    explorer.page(0, 10, sort_by='marque')
+    explorer.page(0, 10, sort_by='valeur', ascending=False)
+
+    assert list(explorer._orders) == [('marque', True, ''), ('valeur', False, '')]
+    assert explorer._orders_bytes == 8_000
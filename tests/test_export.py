@@ -0,0 +1,74 @@
+"""Exports en flux : fichiers uniques par export et suppression après usage"""
+import os
+import time
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from presence.export import EXPORT_MAX_AGE_S, ExportJob, export
+from presence.pushdown import PushdownSelection
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({'marque': ['A', 'B', 'C'] * 50, 'value': [True, False, True] * 50})
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet', 'xlsx'])
+def test_same_second_exports_do_not_collide(df, tmp_path, fmt):
+    premier = export(df, fmt, 'stats', chunk_rows=40, export_dir=str(tmp_path))
+    second = export(df.head(10), fmt, 'stats', chunk_rows=40, export_dir=str(tmp_path))
+
+    assert premier['chemin'] != second['chemin']
+    assert (premier['lignes'], second['lignes']) == (len(df), 10)
+    assert os.path.exists(premier['chemin']) and os.path.exists(second['chemin'])
+
+
+def test_csv_export_round_trip(df, tmp_path):
+    stats = export(df, 'csv', 'stats', chunk_rows=40, export_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(pd.read_csv(stats['chemin']), df)
+
+
+def test_discard_removes_file(df, tmp_path):
+    job = ExportJob(df, 'csv', 'stats', export_dir=str(tmp_path))
+    job._thread.join()
+    assert os.path.exists(job.stats['chemin'])
+
+    job.discard()
+    assert job.discarded and not os.path.exists(job.stats['chemin'])
+
+
+def test_old_exports_are_purged(df, tmp_path):
+    ancien = export(df, 'csv', 'stats', export_dir=str(tmp_path))['chemin']
+    ilya = time.time() - 2 * EXPORT_MAX_AGE_S
+    os.utime(ancien, (ilya, ilya))
+
+    recent = export(df, 'csv', 'stats', export_dir=str(tmp_path))['chemin']
+    assert not os.path.exists(ancien) and os.path.exists(recent)
+    assert os.path.exists(tmp_path / 'exports.jsonl')
+
+
+def test_parquet_schema_does_not_come_from_first_chunk(tmp_path):
+    # Premier bloc : colonne texte entièrement vide et colonne entière ; puis texte et décimaux
+    df = pd.DataFrame({
+        'zone': [None] * 40 + ['Nord'] * 40,
+        'valeur': pd.Series([1] * 40 + [1.5, None] * 20, dtype=object)
+    })
+    stats = export(df, 'parquet', 'stats', chunk_rows=40, export_dir=str(tmp_path))
+
+    relu = pd.read_parquet(stats['chemin'])
+    assert stats['lignes'] == len(df)
+    assert relu['zone'].tolist() == df['zone'].tolist()
+    assert relu['valeur'].iloc[40] == 1.5 and relu['valeur'].iloc[:40].eq(1).all()
+
+
+def test_pushdown_parquet_export(sqlite_path, tmp_path):
+    selection = PushdownSelection(create_engine(f"sqlite:///{sqlite_path}"))
+    stats = export(selection, 'parquet', 'observations', chunk_rows=1_000, export_dir=str(tmp_path))
+
+    relu = pd.read_parquet(stats['chemin'])
+    attendu = pd.concat(selection.iter_chunks(1_000), ignore_index=True)
+    assert stats['lignes'] == len(attendu)
+    pd.testing.assert_frame_equal(relu, attendu, check_dtype=False)
+    assert relu['date'].dtype.kind == 'M' and relu['value'].dtype.kind == 'b'
@@ -0,0 +1,73 @@
+"""FilterIndex : mêmes observations que des masques booléens sur le jeu large"""
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from presence import engine
+from presence.filters import FilterIndex
+
+
+@pytest.fixture(scope='module')
+def dataset(sqlite_path):
+    return engine.load(create_engine(f"sqlite:///{sqlite_path}"))
+
+
+def _masked(large, date_range, marques, segments, zones):
+    """Référence : masques booléens sur le jeu large (date de fin incluse en entier)"""
+    mask = pd.Series(True, index=large.index)
+    if date_range is not None:
+        debut, fin = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1]) + pd.Timedelta(days=1)
+        mask &= (large['date_reference'] >= debut) & (large['date_reference'] < fin)
+    for col, valeurs in (('marque', marques), ('segment', segments), ('zone', zones)):
+        if valeurs:
+            mask &= large[col].isin(valeurs)
+    return large[mask].reset_index(drop=True)
+
+
+def test_filter_matches_boolean_masks(dataset):
+    options = engine.options(dataset)
+    index = FilterIndex(dataset.df)
+    large = dataset.df.to_pandas(['date_reference', 'marque', 'segment', 'zone', 'product_id', 'value'])
+    debut, fin = options['date_min'], options['date_max']
+    milieu = debut + (fin - debut) / 2
+
+    for filters in [
+        engine.Filters(),
+        engine.default_filters(options),
+        engine.Filters((milieu.date(), milieu.date()), None, None, None),
+        engine.Filters((debut.date(), milieu.date()), options['marque'][2:5], options['segment'][:2], options['zone'][1:3]),
+        engine.Filters(None, ['Marque inconnue'])
+    ]:
+        obtenu = index.filter(*filters).to_pandas(list(large.columns)).reset_index(drop=True)
+        pd.testing.assert_frame_equal(obtenu, _masked(large, *filters), check_categorical=False, obj=str(filters))
+
+
+def test_filter_is_memoized_and_order_insensitive(dataset):
+    index = FilterIndex(dataset.df, max_entries=2)
+    marques = engine.options(dataset)['marque'][:3]
+    premier = index.filter(None, marques)
+    assert index.filter(None, list(reversed(marques))) is premier
+
+    # Sélection complète : le jeu partagé lui-même, sans copie
+    assert index.filter() is dataset.df
+
+    # LRU borné : la plus ancienne entrée est recalculée
+    index.filter(None, marques[:1])
+    assert index.filter(None, marques) is not premier
+
+
+def test_memo_is_bounded_by_memory(dataset):
+    marques = engine.options(dataset)['marque']
+    selections = [[marque] for marque in marques[:4]]
+    tailles = [FilterIndex._size_mb(FilterIndex(dataset.df).filter(None, m)) for m in selections]
+
+    # Plafond : les deux dernières sélections seulement
+    plafond = tailles[2] + tailles[3] + min(tailles) / 2
+    index = FilterIndex(dataset.df, max_memo_mb=plafond)
+    for marque in selections:
+        index.filter(None, marque)
+    assert [key[1] for key in index._memo] == [tuple(m) for m in selections[2:]]
+    assert index._memo_mb <= plafond
+
+    # La sélection complète est le jeu partagé : elle ne compte pas dans le plafond
+    assert index.filter() is dataset.df and len(index._memo) == 3
@@ -0,0 +1,41 @@
+"""Ingestion en flux : taille des blocs sous plafond mémoire"""
+import pytest
+from sqlalchemy import create_engine
+
+from presence.ingestion import MIN_CHUNK_ROWS, _next_chunk_rows, ingest
+from presence.sources import SQLSource
+from presence.star import build_dimensions
+
+
+@pytest.fixture(scope='module')
+def source(sqlite_path):
+    return SQLSource(create_engine(f"sqlite:///{sqlite_path}"))
+
+
+def _dimensions(source):
+    return lambda: build_dimensions(*(source.read_dimension(name) for name in ('produits', 'points_de_vente')))
+
+
+def test_chunk_rows_follow_remaining_budget():
+    stats = {'lignes': 50_000, 'apres_mo': 10.0}
+    # Restant : 100 - 2 × 10 = 80 Mo, soit 80 000 lignes à 0,001 Mo
+    assert _next_chunk_rows(stats, 0.001, 100_000, 100) == 80_000
+    assert _next_chunk_rows(stats, 0.001, 20_000, 100) == 20_000
+
+    with pytest.raises(MemoryError, match='50,000 lignes'):
+        _next_chunk_rows(stats, 0.001, 100_000, 20 + (MIN_CHUNK_ROWS - 1) * 0.001)
+
+
+def test_budget_shrinks_chunks(source, n_rows):
+    libre, stats_libres = ingest(source.read_tracking(), _dimensions(source), chunk_rows=n_rows // 2)
+    assert stats_libres['blocs'] == 2
+
+    # Le second bloc ne tient plus dans le budget restant : il est découpé
+    table, stats = ingest(source.read_tracking(), _dimensions(source), chunk_rows=n_rows // 2, memory_limit_mb=1.4)
+    assert stats['blocs'] > stats_libres['blocs']
+    assert stats['lignes'] == len(table) == len(libre) == n_rows
+
+
+def test_exhausted_budget_raises(source):
+    with pytest.raises(MemoryError, match='Plafond mémoire'):
+        ingest(source.read_tracking(), _dimensions(source), chunk_rows=5_000, memory_limit_mb=0.5)
@@ -0,0 +1,93 @@
+"""Chargement incrémental : dimensions modifiées sans relecture de l'historique, plafond mémoire"""
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from conftest import sorted_rows
+from presence.loader import IncrementalLoader
+from presence.schema import memory_usage_mb
+from presence.sources import SQLSource
+
+
+class SpySource(SQLSource):
+    """Source SQL qui consigne le filigrane de chaque lecture du suivi"""
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        self.lectures = []
+
+    def read_tracking(self, after_id=None):
+        self.lectures.append(after_id)
+        return super().read_tracking(after_id)
+
+
+def _wide(dataset):
+    colonnes = ['visit_id', 'product_id', 'value', 'marque', 'nom_point_vente', 'zone', 'date']
+    return sorted_rows(dataset.df[colonnes], ['visit_id', 'product_id'])
+
+
+def test_new_store_reads_only_delta(db_engine):
+    source = SpySource(db_engine)
+    loader = IncrementalLoader()
+    loader.refresh(source)
+    filigrane = loader.watermark['id']
+
+    # Nouveau point de vente, ses premières observations et une marque renommée
+    with db_engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO points_de_vente (id, nom, zone, latitude, longitude, date_ouverture) "
+            "VALUES (100000, 'NOUV1', 'Agadir', 30.42, -9.6, NULL)"
+        ))
+        conn.execute(text(
+            "INSERT INTO tracking_presence SELECT id + 1000000, visit_id + 1000000, product_id, value, created_on, "
+            "'NOUV1', segment FROM tracking_presence WHERE id < (SELECT MIN(id) + 30 FROM tracking_presence)"
+        ))
+        conn.execute(text("UPDATE produits SET marque = 'Marque renommée' WHERE id = 1"))
+    source.lectures.clear()
+    loader.refresh(source)
+
+    assert source.lectures == [filigrane]
+    assert (loader.df['nom_point_vente'] == 'NOUV1').sum() == 30
+
+    complet = IncrementalLoader()
+    complet.refresh(db_engine)
+    assert loader.current.version == complet.current.version
+    pd.testing.assert_frame_equal(_wide(loader.current), _wide(complet.current), check_categorical=False)
+    pd.testing.assert_frame_equal(sorted_rows(loader.cube), sorted_rows(complet.cube), check_categorical=False)
+
+
+def test_unknown_store_facts_force_full_reload(db_engine):
+    with db_engine.begin() as conn:
+        conn.execute(text(
+            "UPDATE tracking_presence SET id_point_de_vente = 'ABSENT' "
+            "WHERE id < (SELECT MIN(id) + 15 FROM tracking_presence)"
+        ))
+    source = SpySource(db_engine)
+    loader = IncrementalLoader()
+    loader.refresh(source)
+
+    # Le point de vente apparaît : ses faits déjà chargés ne peuvent être recodés qu'en relisant tout
+    with db_engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO points_de_vente (id, nom, zone, latitude, longitude, date_ouverture) "
+            "VALUES (100000, 'ABSENT', 'Agadir', 30.42, -9.6, NULL)"
+        ))
+    source.lectures.clear()
+    loader.refresh(source)
+
+    assert source.lectures == [None]
+    assert (loader.df['nom_point_vente'] == 'ABSENT').sum() == 15
+
+
+def test_full_reload_budget_counts_resident_version(db_engine):
+    loader = IncrementalLoader(chunk_rows=2_000)
+    loader.refresh(db_engine)
+    resident = memory_usage_mb(loader.df) + memory_usage_mb(loader.cube)
+
+    # Le plafond suffit à un premier chargement, pas à un second aux côtés de la version servie
+    limite = 2 * resident
+    IncrementalLoader(chunk_rows=2_000, memory_limit_mb=limite).refresh(db_engine)
+    loader.memory_limit_mb = limite
+    with pytest.raises(MemoryError):
+        loader._full_reload(SQLSource(db_engine), loader.signatures)
+    assert loader.current.df is loader.df
@@ -0,0 +1,43 @@
+"""Puits de métriques : rotation du journal JSONL et résumé Prometheus"""
+import json
+import os
+
+from presence.metrics import SINK_BACKUPS, MetricsRecorder
+
+
+def test_jsonl_sink_rotates_and_keeps_backups(tmp_path):
+    sink = tmp_path / 'metrics.jsonl'
+    recorder = MetricsRecorder(str(sink), max_mb=1_000 / 1024 ** 2)
+    for i in range(60):
+        with recorder.stage(f"etape_{i}"):
+            pass
+        recorder.flush()
+
+    fichiers = sorted(os.listdir(tmp_path))
+    assert fichiers == ['metrics.jsonl'] + [f"metrics.jsonl.{i}" for i in range(1, SINK_BACKUPS + 1)]
+    for i in range(1, SINK_BACKUPS + 1):
+        assert os.path.getsize(f"{sink}.{i}") >= 1_000
+
+    # Du plus ancien au plus récent, les mesures gardées se suivent et finissent par la dernière
+    etapes = []
+    for path in [f"{sink}.{i}" for i in range(SINK_BACKUPS, 0, -1)] + [str(sink)]:
+        with open(path, encoding='utf-8') as f:
+            etapes += [json.loads(ligne)['etape'] for ligne in f]
+    numeros = [int(etape.split('_')[1]) for etape in etapes]
+    assert numeros == list(range(numeros[0], 60)) and numeros[0] > 0
+
+
+def test_prometheus_sink(tmp_path):
+    sink = tmp_path / 'metrics.prom'
+    recorder = MetricsRecorder(str(sink))
+    for _ in range(3):
+        with recorder.stage('filtrage'):
+            pass
+    recorder.flush()
+
+    lignes = sink.read_text(encoding='utf-8').splitlines()
+    assert '# TYPE presence_stage_duration_seconds summary' in lignes
+    assert 'presence_stage_duration_seconds_count{stage="filtrage"} 3' in lignes
+    quantiles = [ligne for ligne in lignes if ligne.startswith('presence_stage_duration_seconds{stage="filtrage",quantile=')]
+    assert [ligne.split('quantile="')[1].split('"')[0] for ligne in quantiles] == ['0.5', '0.9', '0.99']
+    assert not os.path.exists(f"{sink}.tmp")
@@ -0,0 +1,50 @@
+"""Agrégats précalculés : aller-retour par la ligne de commande et repli sur le calcul en direct"""
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from presence import cli, engine
+from presence.precompute import PrecomputedSelection, has_aggregates, selection_dir
+
+
+@pytest.fixture
+def db_url(db_engine):
+    return db_engine.url.render_as_string(hide_password=False)
+
+
+def test_cli_aggregates_match_live_rollups(db_url, tmp_path):
+    sortie = str(tmp_path / 'aggregats')
+    assert cli.main(['precompute', '--url', db_url, '--sortie', sortie]) == 0
+
+    dataset = engine.load(create_engine(db_url))
+    for filters in (engine.Filters(), engine.default_filters(engine.options(dataset))):
+        assert has_aggregates(sortie, dataset.version, filters)
+        live = engine.select(dataset, filters)
+        precalcule = PrecomputedSelection(selection_dir(sortie, dataset.version, filters), live)
+        for name in engine.ROLLUPS:
+            pd.testing.assert_frame_equal(
+                engine.aggregate(precalcule, name), engine.aggregate(live, name),
+                check_categorical=False, check_index_type=False, obj=f"{name} {filters}"
+            )
+        assert engine.kpis(precalcule) == engine.kpis(live)
+
+
+def test_new_version_falls_back_to_live(db_url, tmp_path):
+    sortie = str(tmp_path / 'aggregats')
+    cli.main(['precompute', '--url', db_url, '--sortie', sortie])
+    version = engine.load(create_engine(db_url)).version
+
+    with create_engine(db_url).begin() as conn:
+        conn.execute(text(
+            "INSERT INTO tracking_presence SELECT id + 1000000, visit_id + 1000000, product_id, value, created_on, "
+            "id_point_de_vente, segment FROM tracking_presence WHERE id < (SELECT MIN(id) + 30 FROM tracking_presence)"
+        ))
+    dataset = engine.load(create_engine(db_url))
+    assert dataset.version != version
+    assert has_aggregates(sortie, version, engine.Filters())
+    assert not has_aggregates(sortie, dataset.version, engine.Filters())
+
+    # Remontée hors ROLLUPS : déléguée à la sélection en direct
+    live = engine.select(dataset)
+    precalcule = PrecomputedSelection(selection_dir(sortie, version, engine.Filters()), live)
+    pd.testing.assert_frame_equal(precalcule.rollup(['segment', 'zone']), live.rollup(['segment', 'zone']))
@@ -0,0 +1,52 @@
+"""Classements partiels ``top_k`` / ``bottom_k`` comparés à un tri complet"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from presence.ranking import bottom_k, top_k
+
+
+@pytest.fixture
+def stats():
+    return pd.DataFrame({
+        'nom': list('abcdefg'),
+        'Taux_Presence': [0.5, 0.9, 0.5, np.nan, 0.1, 0.9, 0.5]
+    })
+
+
+def test_top_k_matches_stable_sort(stats):
+    attendu = stats.sort_values('Taux_Presence', ascending=False, kind='stable', na_position='last').head(4)
+    pd.testing.assert_frame_equal(top_k(stats, 'Taux_Presence', 4), attendu)
+
+
+def test_bottom_k_matches_stable_sort(stats):
+    attendu = stats.sort_values('Taux_Presence', ascending=True, kind='stable', na_position='last').head(3)
+    pd.testing.assert_frame_equal(bottom_k(stats, 'Taux_Presence', 3), attendu)
+
+
+def test_ties_first_keeps_exactly_k_rows(stats):
+    # 0,9 (b, f) puis le premier des trois 0,5 dans l'ordre d'origine
+    assert list(top_k(stats, 'Taux_Presence', 3)['nom']) == ['b', 'f', 'a']
+
+
+def test_ties_all_keeps_every_tie(stats):
+    assert list(top_k(stats, 'Taux_Presence', 3, ties='all')['nom']) == ['b', 'f', 'a', 'c', 'g']
+    assert list(bottom_k(stats, 'Taux_Presence', 2, ties='all')['nom']) == ['e', 'a', 'c', 'g']
+
+
+def test_k_larger_than_rows_returns_all_rows(stats):
+    classement = top_k(stats, 'Taux_Presence', 100)
+    assert len(classement) == len(stats)
+    # Les valeurs manquantes sont classées en dernier
+    assert classement['nom'].iloc[-1] == 'd'
+    assert len(bottom_k(stats, 'Taux_Presence', 100, ties='all')) == len(stats)
+
+
+def test_empty_and_non_positive_k(stats):
+    assert top_k(stats, 'Taux_Presence', 0).empty
+    assert top_k(stats.iloc[:0], 'Taux_Presence', 5).empty
+
+
+def test_invalid_ties_raises(stats):
+    with pytest.raises(ValueError):
+        top_k(stats, 'Taux_Presence', 2, ties='dense')
@@ -0,0 +1,81 @@
+"""Rafraîchissement en tâche de fond : version précédente servie, erreurs et attente bornée"""
+import threading
+
+from presence.loader import IncrementalLoader
+from presence.refresher import BackgroundRefresher
+from presence.sources import SQLSource
+
+
+class BlockingSource(SQLSource):
+    """Source SQL dont la lecture attend ``release`` (rafraîchissement lent)"""
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def signatures(self):
+        self.started.set()
+        self.release.wait(10)
+        return super().signatures()
+
+
+class FailingSource(SQLSource):
+    """Source SQL dont la base est injoignable"""
+
+    def signatures(self):
+        raise ConnectionError("base injoignable")
+
+
+def test_previous_version_served_while_refreshing(db_engine):
+    lente = BlockingSource(db_engine)
+    sources = iter([SQLSource(db_engine), lente])
+    loader = IncrementalLoader()
+    refresher = BackgroundRefresher(loader, lambda: next(sources))
+    refresher.refresh_once()
+    publiee = loader.current
+
+    thread = threading.Thread(target=refresher.refresh_once)
+    thread.start()
+    try:
+        assert lente.started.wait(10)
+        assert refresher.status['etat'] == 'rafraîchissement en cours'
+        assert loader.current is publiee
+    finally:
+        lente.release.set()
+        thread.join(10)
+    assert refresher.status['etat'] == 'à jour'
+    assert loader.current.version == publiee.version
+
+
+def test_failed_refresh_keeps_version_and_reports_error(db_engine):
+    sources = iter([SQLSource(db_engine), FailingSource(db_engine)])
+    loader = IncrementalLoader()
+    refresher = BackgroundRefresher(loader, lambda: next(sources))
+    refresher.refresh_once()
+    publiee = loader.current
+
+    refresher.refresh_once()
+    status = refresher.status
+    assert status['etat'] == 'erreur' and status['erreur'] == 'base injoignable'
+    assert status['dernier_succes'] < status['derniere_tentative']
+    assert loader.current is publiee
+
+
+def test_first_failure_releases_waiting_sessions(db_engine):
+    refresher = BackgroundRefresher(IncrementalLoader(), lambda: FailingSource(db_engine))
+    refresher.refresh_once()
+    assert refresher.wait_ready(timeout=0)
+    assert refresher.loader.current is None and refresher.status['etat'] == 'erreur'
+
+
+def test_wait_ready_times_out(db_engine):
+    lente = BlockingSource(db_engine)
+    refresher = BackgroundRefresher(IncrementalLoader(), lambda: lente).start()
+    try:
+        assert lente.started.wait(10)
+        assert not refresher.wait_ready(timeout=0.05)
+    finally:
+        lente.release.set()
+    assert refresher.wait_ready(timeout=10)
+    assert refresher.loader.current is not None
@@ -0,0 +1,87 @@
+"""Cache LRU des agrégats et figures : taille bornée, éviction LRU, invalidation par version"""
+import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from presence.resultcache import ResultCache, cache_key
+
+FILTRES = ((datetime.date(2025, 1, 1), datetime.date(2025, 3, 31)), ['A', 'B'], None, None)
+
+
+def _frame(n_octets):
+    return pd.DataFrame({'x': np.zeros(n_octets // 8)})
+
+
+def _compteur():
+    appels = []
+
+    def compute(n_octets=100_000):
+        appels.append(n_octets)
+        return _frame(n_octets)
+    return compute, appels
+
+
+def test_size_bound_and_lru_eviction():
+    cache = ResultCache(max_mb=1)
+    compute, appels = _compteur()
+    for i in range(4):
+        cache.aggregate(f"agregat_{i}", FILTRES, 'v1', lambda: compute(300_000))
+        # agregat_0 est relu à chaque tour : il reste le plus récemment utilisé
+        cache.aggregate('agregat_0', FILTRES, 'v1', lambda: compute(300_000))
+
+    stats = cache.stats()
+    assert stats['taille_mo'] <= stats['max_mo']
+    assert stats['evictions'] >= 1
+    assert len(appels) == 4
+
+    # agregat_1, le moins récemment utilisé, a été évincé ; agregat_0 est servi sans calcul
+    cache.aggregate('agregat_0', FILTRES, 'v1', lambda: compute(300_000))
+    assert len(appels) == 4
+    cache.aggregate('agregat_1', FILTRES, 'v1', lambda: compute(300_000))
+    assert len(appels) == 5
+
+
+def test_oversized_entry_is_returned_but_not_kept():
+    cache = ResultCache(max_mb=0.1)
+    compute, appels = _compteur()
+    for _ in range(2):
+        assert len(cache.aggregate('gros', FILTRES, 'v1', lambda: compute(1_000_000))) == 125_000
+    assert len(appels) == 2 and cache.stats()['entrees'] == 0
+
+
+def test_new_version_invalidates_entries():
+    cache = ResultCache()
+    compute, appels = _compteur()
+    cache.aggregate('kpis', FILTRES, 'v1', compute)
+    cache.aggregate('kpis', FILTRES, 'v1', compute)
+    cache.aggregate('kpis', FILTRES, 'v2', compute)
+    assert len(appels) == 2
+    assert cache.stats()['invalidations'] == 1 and cache.stats()['version'] == 'v2'
+
+
+def test_cached_values_are_not_shared_for_writes():
+    cache = ResultCache()
+    premier = cache.aggregate('kpis', FILTRES, 'v1', lambda: _frame(80))
+    premier['x'] = 1.0
+    assert (cache.aggregate('kpis', FILTRES, 'v1', lambda: _frame(80))['x'] == 0).all()
+
+
+def test_figures_are_kept_serialized():
+    cache = ResultCache()
+    appels = []
+
+    def build():
+        appels.append(1)
+        return go.Figure(go.Bar(x=['a'], y=[1]))
+    assert cache.figure('fig', FILTRES, 'v1', build).data[0].y == (1,)
+    assert cache.figure('fig', FILTRES, 'v1', build).data[0].y == (1,)
+    assert len(appels) == 1
+    assert cache.figure('vide', FILTRES, 'v1', lambda: None) is None
+
+
+def test_cache_key_is_canonical():
+    periode = (pd.Timestamp('2025-01-01'), pd.Timestamp('2025-03-31'))
+    assert cache_key('kpis', FILTRES, 'v1') == cache_key('kpis', (periode, ['B', 'A'], [], None), 'v1')
+    assert cache_key('kpis', FILTRES, 'v1') != cache_key('kpis', FILTRES, 'v2')
@@ -0,0 +1,79 @@
+"""Esquisses HyperLogLog par partition : mise à jour incrémentale et précision"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from presence.cube import SKETCH_COLUMNS, filter_cube
+from presence.sketch import DEFAULT_PRECISION, DailySketches
+
+N_ROWS = 200_000
+# Erreur type ≈ 1,04 / √m ; trois écarts types
+TOLERANCE = 3 * 1.04 / np.sqrt(1 << DEFAULT_PRECISION)
+
+MARQUES = [f"Marque {i}" for i in range(6)]
+SEGMENTS = ['Eau PET', 'Jus Brique', 'Soda Canette']
+ZONES = ['Casablanca', 'Rabat', 'Tanger', 'Agadir']
+
+
+@pytest.fixture(scope='module')
+def cube():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'date': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 90, N_ROWS), unit='D'),
+        'marque': pd.Categorical(np.array(MARQUES)[rng.integers(0, len(MARQUES), N_ROWS)]),
+        'segment': pd.Categorical(np.array(SEGMENTS)[rng.integers(0, len(SEGMENTS), N_ROWS)]),
+        'zone': pd.Categorical(np.array(ZONES)[rng.integers(0, len(ZONES), N_ROWS)]),
+        'product_id': rng.integers(1, 400, N_ROWS),
+        'nom_point_vente': np.char.add('PDV', rng.integers(0, 30_000, N_ROWS).astype(str))
+    })
+
+
+@pytest.fixture(scope='module')
+def filters_list():
+    return [
+        (None, None, None, None),
+        (('2025-01-10', '2025-02-20'), None, None, None),
+        (None, MARQUES[:2], None, None),
+        (('2025-02-01', '2025-03-31'), MARQUES[1:4], SEGMENTS[:1], ZONES[2:]),
+        (('2026-01-01', '2026-01-31'), None, None, None)
+    ]
+
+
+def _counts(sketches, filters_list):
+    return [[sketches.count(col, *filters) for col in SKETCH_COLUMNS] for filters in filters_list]
+
+
+@pytest.mark.parametrize('split', ['date', 'lignes'])
+def test_incremental_update_equals_full_build(cube, filters_list, split):
+    # Par date : partitions nouvelles ; par lignes : partitions communes aux deux blocs
+    if split == 'date':
+        premier = (cube['date'] < pd.Timestamp('2025-02-15')).to_numpy()
+    else:
+        premier = np.arange(len(cube)) % 2 == 0
+    complet = DailySketches.from_cube(cube, SKETCH_COLUMNS)
+    incremental = DailySketches.from_cube(cube[premier], SKETCH_COLUMNS).update(cube[~premier])
+
+    assert len(incremental.partitions) == len(complet.partitions)
+    assert _counts(incremental, filters_list) == _counts(complet, filters_list)
+
+
+def test_update_leaves_published_sketches_unchanged(cube, filters_list):
+    avant = DailySketches.from_cube(cube.iloc[:1000], SKETCH_COLUMNS)
+    comptes = _counts(avant, filters_list)
+    avant.update(cube.iloc[1000:])
+    assert _counts(avant, filters_list) == comptes
+
+
+def test_counts_within_expected_error(cube, filters_list):
+    sketches = DailySketches.from_cube(cube, SKETCH_COLUMNS)
+    for filters in filters_list:
+        selection = filter_cube(cube, *filters)
+        for col in SKETCH_COLUMNS:
+            exact = selection[col].nunique()
+            estime = sketches.count(col, *filters)
+            assert abs(estime - exact) <= max(1, TOLERANCE * exact), (filters, col, estime, exact)
+
+
+def test_empty_sketches_count_zero():
+    sketches = DailySketches(SKETCH_COLUMNS)
+    assert sketches.count('product_id') == 0
@@ -0,0 +1,90 @@
+"""Instantané Arrow IPC : relecture à l'identique et invalidation des versions"""
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from conftest import sorted_rows
+from presence import snapshot
+from presence.loader import IncrementalLoader
+from presence.snapshot import load_snapshot, save_snapshot
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / 'cache' / 'presence_snapshot.arrow')
+
+
+def test_round_trip(db_engine, snapshot_path):
+    loader = IncrementalLoader(snapshot_path=snapshot_path)
+    loader.refresh(db_engine)
+
+    table, watermark, signatures = load_snapshot(snapshot_path)
+    pd.testing.assert_frame_equal(table.facts, loader.df.facts)
+    for name, dimension in loader.df.dimensions._asdict().items():
+        pd.testing.assert_frame_equal(getattr(table.dimensions, name), dimension, obj=name)
+    assert watermark == loader.watermark
+    assert signatures == loader.signatures
+
+
+def test_restore_publishes_same_version_without_database(db_engine, snapshot_path):
+    loader = IncrementalLoader(snapshot_path=snapshot_path)
+    loader.refresh(db_engine)
+
+    restaure = IncrementalLoader(snapshot_path=snapshot_path).restore()
+    assert restaure.version == loader.current.version
+    pd.testing.assert_frame_equal(sorted_rows(restaure.cube), sorted_rows(loader.cube), check_categorical=False)
+
+
+def test_other_format_or_corrupt_file_is_ignored(db_engine, snapshot_path, monkeypatch):
+    loader = IncrementalLoader(snapshot_path=snapshot_path)
+    loader.refresh(db_engine)
+
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_FORMAT', snapshot.SNAPSHOT_FORMAT + 1)
+    assert load_snapshot(snapshot_path) is None
+    monkeypatch.undo()
+
+    with open(snapshot_path, 'wb') as f:
+        f.write(b'pas un fichier Arrow')
+    assert load_snapshot(snapshot_path) is None
+    assert IncrementalLoader(snapshot_path=snapshot_path).restore() is None
+
+
+def test_new_rows_and_dimension_changes_invalidate_version(db_engine, snapshot_path):
+    loader = IncrementalLoader(snapshot_path=snapshot_path)
+    loader.refresh(db_engine)
+    version = loader.current.version
+
+    # Aucun changement : même version, instantané inchangé
+    loader.refresh(db_engine)
+    assert loader.current.version == version
+
+    # Nouvelles observations : le filigrane avance, l'instantané suit
+    with db_engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO tracking_presence SELECT id + 1000000, visit_id + 1000000, product_id, value, created_on, "
+            "id_point_de_vente, segment FROM tracking_presence WHERE id < (SELECT MIN(id) + 30 FROM tracking_presence)"
+        ))
+    loader.refresh(db_engine)
+    assert loader.current.version != version
+    assert load_snapshot(snapshot_path)[1] == loader.watermark
+    version = loader.current.version
+
+    # Dimension modifiée : faits recodés, la nouvelle marque est visible après restauration
+    with db_engine.begin() as conn:
+        conn.execute(text("UPDATE produits SET marque = 'Marque renommée' WHERE id = 1"))
+    loader.refresh(db_engine)
+    assert loader.current.version != version
+
+    restaure = IncrementalLoader(snapshot_path=snapshot_path).restore()
+    assert restaure.version == loader.current.version
+    assert 'Marque renommée' in set(restaure.cube['marque'].dropna())
+
+
+def test_save_is_atomic(db_engine, snapshot_path):
+    loader = IncrementalLoader()
+    loader.refresh(db_engine)
+    save_snapshot(loader.df, snapshot_path, loader.watermark, loader.signatures)
+    assert load_snapshot(snapshot_path) is not None
+    assert not os.path.exists(f"{snapshot_path}.tmp")
@@ -0,0 +1,74 @@
+"""Sources des observations : les exports CSV et Parquet donnent le même jeu que la base"""
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from benchmarks.generator import write_parquet
+from conftest import sorted_rows
+from presence import engine
+from presence.sources import TABLE_TRACKING, TABLES_DIMENSIONS, FileSource, SQLSource
+
+
+@pytest.fixture(scope='module')
+def sql_source(sqlite_path):
+    return SQLSource(create_engine(f"sqlite:///{sqlite_path}"))
+
+
+@pytest.fixture(scope='module')
+def parquet_dir(tmp_path_factory, n_rows):
+    # Même graine et même taille que la base de ``sqlite_path`` : mêmes lignes
+    return write_parquet(str(tmp_path_factory.mktemp('parquet')), n_rows)
+
+
+@pytest.fixture(scope='module')
+def csv_dir(sqlite_path, tmp_path_factory):
+    """Tables de la base exportées en CSV, le suivi en deux fichiers quotidiens"""
+    directory = tmp_path_factory.mktemp('csv')
+    with sqlite3.connect(sqlite_path) as conn:
+        for name in TABLES_DIMENSIONS:
+            pd.read_sql(f"SELECT * FROM {name}", conn).to_csv(directory / f"{name}.csv", index=False)
+        tracking = pd.read_sql(f"SELECT * FROM {TABLE_TRACKING} ORDER BY id", conn)
+    os.makedirs(directory / TABLE_TRACKING)
+    moitie = len(tracking) // 2
+    tracking.iloc[:moitie].to_csv(directory / TABLE_TRACKING / "jour_1.csv", index=False)
+    tracking.iloc[moitie:].to_csv(directory / TABLE_TRACKING / "jour_2.csv", index=False)
+    return str(directory)
+
+
+@pytest.fixture(scope='module')
+def attendu(sql_source):
+    return engine.load(sql_source)
+
+
+@pytest.mark.parametrize('directory', ['parquet_dir', 'csv_dir'])
+def test_file_source_matches_sql_source(attendu, directory, request):
+    obtenu = engine.load(FileSource(request.getfixturevalue(directory)))
+
+    assert obtenu.watermark == attendu.watermark
+    large = obtenu.df.to_pandas().sort_values(['created_on', 'product_id'], kind='stable').reset_index(drop=True)
+    reference = attendu.df.to_pandas().sort_values(['created_on', 'product_id'], kind='stable').reset_index(drop=True)
+    pd.testing.assert_frame_equal(large, reference, check_categorical=False)
+    pd.testing.assert_frame_equal(sorted_rows(obtenu.cube), sorted_rows(attendu.cube), check_categorical=False)
+
+
+@pytest.mark.parametrize('directory', [None, 'parquet_dir'])
+def test_delta_reads_only_rows_after_id(sql_source, directory, request, n_rows):
+    source = sql_source if directory is None else FileSource(request.getfixturevalue(directory))
+    with source.read_tracking() as fetch:
+        dernier_id = int(fetch(500)['id'].max())
+    with source.read_tracking(after_id=dernier_id) as fetch:
+        suite = fetch(n_rows)
+    assert len(suite) == n_rows - 500
+    assert suite['id'].min() == dernier_id + 1
+
+
+def test_file_source_period_bounds(parquet_dir, n_rows):
+    source = FileSource(parquet_dir, since='2025-07-01', until='2025-08-01')
+    with source.read_tracking() as fetch:
+        lignes = fetch(n_rows)
+    assert len(lignes) > 0
+    assert lignes['created_on'].min() >= pd.Timestamp('2025-07-01')
+    assert lignes['created_on'].max() < pd.Timestamp('2025-08-01')
@@ -0,0 +1,61 @@
+"""Ruptures et tendances : la mise à jour incrémentale égale une reconstruction complète"""
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from conftest import sorted_rows
+from presence.loader import IncrementalLoader
+from presence.streaks import StreakState
+
+# Coupures hors multiple de 15 (produits par visite) : une visite est à cheval sur deux deltas
+CUTS = [7_007, 13_511]
+
+
+@pytest.fixture
+def reserve(db_engine):
+    """Copie de la base dont le suivi est vidé dans ``tracking_reserve``, publié par ``_release``"""
+    with db_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE tracking_reserve AS SELECT * FROM tracking_presence"))
+        conn.execute(text("DELETE FROM tracking_presence"))
+    return db_engine
+
+
+def _release(db_engine, n_rows):
+    """Publie dans la table de suivi les ``n_rows`` premières lignes de la réserve"""
+    with db_engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO tracking_presence SELECT * FROM tracking_reserve "
+            "WHERE id NOT IN (SELECT id FROM tracking_presence) ORDER BY id LIMIT :n"
+        ), {'n': n_rows})
+
+
+def _sorted(frame):
+    return sorted_rows(frame, ['nom_point_vente', 'product_id'])
+
+
+def test_incremental_streaks_equal_full_rebuild(reserve, n_rows):
+    loader = IncrementalLoader()
+    precedent = 0
+    for cut in CUTS + [n_rows]:
+        _release(reserve, cut - precedent)
+        loader.refresh(reserve)
+        precedent = cut
+
+    dataset = loader.current
+    assert len(dataset.df) == n_rows
+    pd.testing.assert_frame_equal(_sorted(dataset.streaks.to_frame()), _sorted(StreakState.from_table(dataset.df).to_frame()))
+
+
+def test_visit_split_across_delta_is_merged(reserve, n_rows):
+    loader = IncrementalLoader()
+    _release(reserve, CUTS[0])
+    loader.refresh(reserve)
+    _release(reserve, n_rows - CUTS[0])
+    loader.refresh(reserve)
+
+    dataset = loader.current
+    complet = StreakState.from_table(dataset.df)
+    # Une visite à cheval n'est comptée qu'une fois par couple
+    assert dataset.streaks.visites.sum() == complet.visites.sum()
+    assert (dataset.streaks.to_frame()['visites'] > 0).all()
+    pd.testing.assert_frame_equal(_sorted(dataset.streaks.alerts()), _sorted(complet.alerts()))
@@ -0,0 +1,69 @@
+"""Séries temporelles : granularité adaptative, regroupement et sous-échantillonnage LTTB"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from presence.timeseries import choose_granularity, downsample, lttb, resample_stats
+
+
+@pytest.mark.parametrize('jours, attendu', [(0, 'jour'), (92, 'jour'), (93, 'semaine'), (731, 'semaine'), (732, 'mois')])
+def test_granularity_boundaries(jours, attendu):
+    debut = pd.Timestamp('2024-01-01')
+    assert choose_granularity(debut, debut + pd.Timedelta(days=jours)) == attendu
+
+
+def test_lttb_keeps_endpoints_and_budget():
+    x = np.arange(1_000)
+    y = np.sin(x / 25) + (x == 500) * 5
+    indices = lttb(x, y, 50)
+
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert (np.diff(indices) > 0).all()
+    # Le pic isolé est conservé
+    assert 500 in indices
+
+    assert lttb(x, y, 2_000).tolist() == x.tolist()
+
+
+def test_downsample_returns_dates():
+    stats = pd.DataFrame({'date': pd.date_range('2025-01-01', periods=365), 'Taux_Presence': np.linspace(0, 1, 365)})
+    x, y = downsample(stats, 'Taux_Presence', 40)
+    assert len(x) == len(y) == 40
+    assert x[0] == stats['date'].iloc[0] and x[-1] == stats['date'].iloc[-1]
+
+
+@pytest.fixture
+def daily():
+    dates = pd.date_range('2025-01-27', '2025-03-04', freq='D')
+    observations = np.arange(1, len(dates) + 1) * 10
+    return pd.DataFrame({
+        'date': dates,
+        'Observations': observations,
+        'Presences': observations // 2 + (dates.day % 3),
+        'Taux_Presence': 0.0
+    })
+
+
+def test_resample_by_iso_week(daily):
+    semaines = resample_stats(daily, 'semaine')
+    lundis = daily['date'] - pd.to_timedelta(daily['date'].dt.weekday, unit='D')
+
+    assert (semaines['date'].dt.weekday == 0).all()
+    assert semaines['date'].tolist() == sorted(lundis.unique())
+    premiere = daily[lundis == semaines['date'].iloc[0]]
+    assert semaines['Observations'].iloc[0] == premiere['Observations'].sum()
+    assert semaines['Observations'].sum() == daily['Observations'].sum()
+    # Taux recalculé sur les sommes, pas moyenne des taux journaliers
+    assert (semaines['Taux_Presence'] == (semaines['Presences'] / semaines['Observations']).round(3)).all()
+
+
+def test_resample_by_month(daily):
+    mois = resample_stats(daily, 'mois')
+    assert mois['date'].dt.strftime('%Y-%m').tolist() == ['2025-01', '2025-02', '2025-03']
+    fevrier = daily[daily['date'].dt.month == 2]
+    assert mois['Observations'].iloc[1] == fevrier['Observations'].sum()
+    assert mois['Presences'].iloc[1] == fevrier['Presences'].sum()
+    assert mois['Taux_Presence'].iloc[1] == round(fevrier['Presences'].sum() / fevrier['Observations'].sum(), 3)
+
+    assert resample_stats(daily, 'jour') is daily